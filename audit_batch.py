@@ -0,0 +1,409 @@
+"""Headless batch mode: generate templates from audit exports without tkinter
+
+Usage:
+    python audit_batch.py --out out_dir/ exports/*.zip
+
+For every ZIP, writes out_dir/<zip name>/dealership_templates.txt and
+out_dir/<zip name>/csm_templates.txt (ZIPs from different directories that
+share a name get numbered folders: <zip name>_2, ...). Exports are processed in parallel on a
+process pool, then consolidated into out_dir/all_dealership_templates.txt
+(every rooftop, labelled with the export it came from),
+out_dir/all_csm_templates.txt (one template per CSM across all exports) and
+out_dir/summary.csv. With --eml or --mbox every template is also written as
+an email draft, to out_dir/<zip name>/emails/*.eml or
+out_dir/<zip name>/templates.mbox, and with --jsonl or --csv the grouped
+rooftop and CSM data is written next to the templates (see audit_export).
+--profile writes a per-stage timing report to out_dir/profile_report.txt
+(see audit_profile).
+Nothing in this module imports tkinter, so it runs on servers and in
+containers with no display. audit_export (and the email package behind it)
+is only imported when an extra output is asked for, which keeps worker
+start-up short where each process re-imports this module.
+"""
+import argparse
+import collections
+import csv
+import glob
+import itertools
+import os
+import sys
+import time
+import zipfile
+
+import audit_cache
+import audit_core
+import audit_profile
+
+
+SUMMARY_FIELDS = ['export', 'status', 'dealership_templates', 'phone_lines', 'csm_templates', 'unknown_csm_rooftops',
+                  'seconds', 'encodings', 'error']
+
+
+def format_dealership_templates(renderer, source=None):
+    """Join every dealership template, with its subject line, into one text
+
+    source, if given, names the export above each template.
+    """
+    prefix = f"Source: {source}\n" if source else ""
+    return audit_core.join_templates(
+        f"{prefix}Subject: {renderer.subject_line(rooftop_name)}\n\n{renderer.dealership(rooftop_name)}"
+        for rooftop_name in renderer.rooftops
+    )
+
+
+def format_csm_templates(renderer):
+    """Join every CSM template into one text, noting skipped rooftops"""
+    parts = []
+    for csm_owner in renderer.csm_owners():
+        template = renderer.csm(csm_owner)
+        skipped_list = renderer.csm_rooftops[csm_owner]['skipped']
+        if skipped_list:
+            template += f"\n\n[Skipped {len(skipped_list)} rooftop(s) - not in lines file: {', '.join(skipped_list)}]"
+        parts.append(template)
+    return audit_core.join_templates(parts)
+
+
+def write_text(path, text):
+    """Write text as UTF-8, creating the parent directory"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def load_export(zip_path, encodings, cache=None):
+    """Grouped (rooftops, csm_rooftops) for a ZIP, from the cache when unchanged"""
+    if cache is None:
+        return audit_core.generate_from_zip(zip_path, encodings)
+
+    with audit_profile.span('export cache lookup'):
+        cache_key = audit_cache.export_key(zip_path)
+        cached = cache.load(cache_key)
+    if cached is not None:
+        encodings.update(cached['encodings'])
+        return cached['rooftops'], cached['csm_rooftops']
+
+    result = audit_core.generate_from_zip(zip_path, encodings)
+    if result is not None:
+        with audit_profile.span('save to cache'):
+            cache.save(cache_key, {'rooftops': result[0], 'csm_rooftops': result[1], 'encodings': dict(encodings)})
+    return result
+
+
+def export_dir(out_dir, folder_name):
+    """Output folder for one export"""
+    return os.path.join(out_dir, folder_name)
+
+
+def export_names(zip_paths):
+    """{zip path: (label, folder name)}, unique even when ZIPs in different directories share a name
+
+    A ZIP whose file name is unique is labelled with that name and written to
+    a folder named after it. ZIPs sharing a file name are labelled with their
+    path instead and get numbered folders (export, export_2, ...) in input
+    order. Names are compared case-insensitively, as Windows folders are.
+    """
+    name_counts = collections.Counter(os.path.basename(path).lower() for path in zip_paths)
+    used = set()
+    names = {}
+    for zip_path in zip_paths:
+        basename = os.path.basename(zip_path)
+        stem = os.path.splitext(basename)[0]
+        folder_name, number = stem, 1
+        while folder_name.lower() in used:
+            number += 1
+            folder_name = f"{stem}_{number}"
+        used.add(folder_name.lower())
+        names[zip_path] = (basename if name_counts[basename.lower()] == 1 else zip_path, folder_name)
+    return names
+
+
+def write_export(renderer, out_dir, folder_name):
+    """Write one export's dealership and CSM templates to its own folder"""
+    folder = export_dir(out_dir, folder_name)
+    write_text(os.path.join(folder, 'dealership_templates.txt'), format_dealership_templates(renderer))
+    if renderer.csm_rooftops is not None:
+        write_text(os.path.join(folder, 'csm_templates.txt'), format_csm_templates(renderer))
+
+
+def write_extras(renderer, out_dir, folder_name, formats):
+    """Write one export's optional outputs: any of 'eml', 'mbox', 'jsonl' and 'csv'"""
+    import audit_export
+    folder = export_dir(out_dir, folder_name)
+
+    def emails():
+        return itertools.chain(audit_export.dealership_emails(renderer), audit_export.csm_emails(renderer))
+
+    if 'eml' in formats:
+        audit_export.write_eml_files(emails(), os.path.join(folder, 'emails'))
+    if 'mbox' in formats:
+        audit_export.write_mbox(emails(), os.path.join(folder, 'templates.mbox'))
+    audit_export.write_data(renderer.rooftops, renderer.csm_rooftops, folder,
+                            [name for name in audit_export.DATA_FORMATS if name in formats])
+
+
+def unknown_csm_count(csm_rooftops):
+    """Rooftops with lines but no rooftop_information.csv row"""
+    if csm_rooftops is None or audit_core.UNKNOWN_CSM not in csm_rooftops:
+        return 0
+    return len(csm_rooftops[audit_core.UNKNOWN_CSM]['included'])
+
+
+def process_archive(zip_path, out_dir, cache_dir=None, use_cache=True, extra_formats=(), profile_options=None,
+                    names=None):
+    """Process one export (in a pool worker) and describe the outcome
+
+    names is the export's (label, folder name) from export_names; by default
+    both come from the ZIP's file name. Writes the export's own folder and returns a dict with the summary
+    fields, the export's dealership text for the consolidated file
+    ('dealership_text'), its 'csm_rooftops' for merging and the normaliser
+    cache counters it used ('cache_counts'). With profile_options
+    ((cprofile, memory)) the export is profiled on its own and the exported
+    profile is returned as 'profile'.
+    """
+    if names is None:
+        names = export_names([zip_path])[zip_path]
+    label, folder_name = names
+    if profile_options is not None:
+        audit_profile.start(*profile_options)
+    start = time.perf_counter()
+    counts_before = normaliser_counts()
+    outcome = {
+        'export': label,
+        'status': 'failed',
+        'encodings': {},
+        'error': '',
+        'dealership_text': '',
+        'csm_rooftops': None,
+        'profile': None,
+    }
+
+    try:
+        cache = audit_cache.ExportCache(cache_dir) if use_cache else None
+        with audit_profile.span('load export'):
+            result = load_export(zip_path, outcome['encodings'], cache)
+        if result is None:
+            outcome['error'] = "required CSV files or columns missing"
+        else:
+            renderer = audit_core.TemplateRenderer(*result)
+            with audit_profile.span('write templates'):
+                write_export(renderer, out_dir, folder_name)
+            if extra_formats:
+                with audit_profile.span('write extras'):
+                    write_extras(renderer, out_dir, folder_name, extra_formats)
+            outcome.update({
+                'status': 'ok',
+                'dealership_templates': len(renderer.rooftops),
+                'phone_lines': sum(len(data['lines']) for data in renderer.rooftops.values()),
+                'csm_templates': len(renderer.csm_owners()) if renderer.csm_rooftops is not None else 0,
+                'unknown_csm_rooftops': unknown_csm_count(renderer.csm_rooftops),
+                'dealership_text': format_dealership_templates(renderer, outcome['export']),
+                'csm_rooftops': renderer.csm_rooftops,
+            })
+    except zipfile.BadZipFile:
+        outcome['error'] = "Invalid ZIP file"
+    except Exception as e:
+        outcome['error'] = str(e)
+
+    outcome['seconds'] = round(time.perf_counter() - start, 3)
+    outcome['cache_counts'] = [after - before for after, before in zip(normaliser_counts(), counts_before)]
+    if profile_options is not None:
+        outcome['profile'] = audit_profile.export()
+    return outcome
+
+
+def merge_csm_rooftops(csm_rooftops_list):
+    """Combine per-export CSM groups so each CSM gets one template
+
+    A rooftop in several exports is listed once, and is only reported as
+    skipped if no export included it.
+    """
+    merged = {}
+    for csm_rooftops in csm_rooftops_list:
+        for csm_owner, data in csm_rooftops.items():
+            group = merged.setdefault(csm_owner, {'included': [], 'skipped': []})
+            group['included'].extend(data['included'])
+            group['skipped'].extend(data['skipped'])
+
+    for group in merged.values():
+        unique = {}
+        for rooftop_info in group['included']:
+            unique.setdefault((rooftop_info['rooftop_name'], rooftop_info['inbox_name']), rooftop_info)
+        group['included'] = list(unique.values())
+        included_names = {rooftop_info['rooftop_name'] for rooftop_info in group['included']}
+        group['skipped'] = [name for name in dict.fromkeys(group['skipped']) if name not in included_names]
+    return merged
+
+
+def write_consolidated(out_dir, outcomes):
+    """Write the all-exports template files and summary.csv"""
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Write each export's text as is, rather than joining them all in memory
+    with open(os.path.join(out_dir, 'all_dealership_templates.txt'), 'w', encoding='utf-8', newline='') as f:
+        for outcome in outcomes:
+            f.write(outcome['dealership_text'])
+
+    merged = merge_csm_rooftops(outcome['csm_rooftops'] for outcome in outcomes
+                                if outcome['csm_rooftops'] is not None)
+    write_text(os.path.join(out_dir, 'all_csm_templates.txt'),
+               format_csm_templates(audit_core.TemplateRenderer({}, merged)))
+
+    with open(os.path.join(out_dir, 'summary.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for outcome in outcomes:
+            row = dict(outcome)
+            row['encodings'] = '; '.join(f"{filename}={encoding}" for filename, encoding in outcome['encodings'].items())
+            writer.writerow(row)
+
+
+def expand_inputs(patterns):
+    """Expand glob patterns ourselves, since Windows shells pass them through literally
+
+    A file matched by more than one pattern is only processed once.
+    """
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        for path in matches if matches else [pattern]:
+            key = os.path.normcase(os.path.abspath(path))
+            if key not in seen:
+                seen.add(key)
+                paths.append(path)
+    return paths
+
+
+def normaliser_counts():
+    """Hits and misses of every normaliser cache, as one flat list"""
+    return [count for info in audit_core.normaliser_cache_info().values() for count in (info.hits, info.misses)]
+
+
+def print_cache_stats(counts):
+    """Report how often the phone/name normaliser caches were hit"""
+    for idx, name in enumerate(audit_core.normaliser_cache_info()):
+        hits, misses = counts[2 * idx], counts[2 * idx + 1]
+        calls = hits + misses
+        hit_rate = hits / calls if calls else 0
+        print(f"{name}: {hits} hits, {misses} misses ({hit_rate:.0%})")
+
+
+def report_outcome(outcome):
+    """Print one export's result as soon as it finishes"""
+    if outcome['status'] == 'ok':
+        print(f"✓ {outcome['export']}: {outcome['dealership_templates']} dealership template(s)")
+        for filename, encoding in outcome['encodings'].items():
+            if encoding != 'utf-8':
+                print(f"    {filename} decoded as {encoding}")
+    else:
+        print(f"✗ {outcome['export']}: {outcome['error']}", file=sys.stderr)
+
+
+def init_worker(cache_size, template_file):
+    """Configure a batch process: normaliser cache size and template file"""
+    audit_core.set_normaliser_cache_size(cache_size)
+    audit_core.set_template_file(template_file)
+
+
+def run_batch(patterns, out_dir, cache_stats=False, cache_dir=None, use_cache=True, jobs=None, cache_size=None,
+              extra_formats=(), template_file=None, profile_options=None):
+    """Process every matching ZIP and return a process exit code
+
+    jobs is the number of worker processes (default: one per CPU); with one
+    job everything runs in this process. extra_formats lists the optional
+    outputs wanted per export ('eml', 'mbox', 'jsonl', 'csv'). template_file
+    replaces the default email_templates.txt. profile_options
+    ((cprofile, memory)) turns on the profile report; workers profile their
+    own exports and the stage times are summed across them.
+    """
+    if cache_size is None:
+        cache_size = audit_core.NORMALISER_CACHE_SIZE
+    init_worker(cache_size, template_file)
+    try:
+        # Check the templates once here rather than failing in every worker
+        audit_core.load_templates()
+    except audit_core.TemplateError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 2
+
+    zip_paths = expand_inputs(patterns)
+    names = export_names(zip_paths)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(zip_paths)))
+
+    if profile_options is not None:
+        audit_profile.start(*profile_options)
+        audit_profile.note(f"Batch: {len(zip_paths)} export(s), "
+                           f"{sum(os.path.getsize(path) for path in zip_paths if os.path.isfile(path)) / 1e6:.1f} MB, "
+                           f"{jobs} process(es)")
+
+    outcomes = {}
+    if jobs == 1:
+        for zip_path in zip_paths:
+            outcomes[zip_path] = process_archive(zip_path, out_dir, cache_dir, use_cache, extra_formats,
+                                                 names=names[zip_path])
+            report_outcome(outcomes[zip_path])
+    else:
+        # multiprocessing is only needed (and imported) with more than one job
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        # Each worker profiles its own export and sends the result back to merge
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                 initargs=(cache_size, template_file)) as pool:
+            futures = {pool.submit(process_archive, zip_path, out_dir, cache_dir, use_cache, extra_formats,
+                                   profile_options, names[zip_path]): zip_path
+                       for zip_path in zip_paths}
+            for future in as_completed(futures):
+                zip_path = futures[future]
+                outcomes[zip_path] = future.result()
+                audit_profile.merge(outcomes[zip_path]['profile'])
+                report_outcome(outcomes[zip_path])
+
+    # Consolidate in input order
+    ordered = [outcomes[zip_path] for zip_path in zip_paths]
+    with audit_profile.span('consolidate'):
+        write_consolidated(out_dir, ordered)
+
+    failures = sum(outcome['status'] != 'ok' for outcome in ordered)
+    print(f"Processed {len(zip_paths) - failures} of {len(zip_paths)} export(s) into {out_dir} "
+          f"using {jobs} process(es)")
+    if cache_stats:
+        print_cache_stats([sum(counts) for counts in zip(*(outcome['cache_counts'] for outcome in ordered))])
+    if profile_options is not None:
+        report_path = os.path.join(out_dir, audit_profile.REPORT_FILE_NAME)
+        audit_profile.finish(report_path)
+        print(f"Profile report written to {report_path}")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate dealership and CSM templates from audit ZIP exports without a display"
+    )
+    parser.add_argument('zips', nargs='+', help="ZIP exports (glob patterns are expanded)")
+    parser.add_argument('--out', '-o', default='templates_out', help="Output directory (default: templates_out)")
+    parser.add_argument('--eml', action='store_true', help="Also write every template as an .eml draft")
+    parser.add_argument('--mbox', action='store_true', help="Also write every template into one mbox per export")
+    parser.add_argument('--jsonl', action='store_true', help="Also write the grouped rooftops and CSMs as JSON Lines")
+    parser.add_argument('--csv', action='store_true', help="Also write the grouped rooftops and CSMs as CSV")
+    parser.add_argument('--templates', metavar='FILE', help="Email wording to use (default: email_templates.txt)")
+    parser.add_argument('--jobs', '-j', type=int, help="Exports processed in parallel (default: one per CPU)")
+    parser.add_argument('--cache-size', type=int, default=audit_core.NORMALISER_CACHE_SIZE,
+                        help=f"Entries kept by the phone/name normaliser caches, 0 to disable (default: {audit_core.NORMALISER_CACHE_SIZE})")
+    parser.add_argument('--cache-stats', action='store_true', help="Print normaliser cache hits and misses at the end")
+    parser.add_argument('--cache-dir', help="Where parsed exports are cached (default: the per-user cache directory)")
+    parser.add_argument('--no-cache', action='store_true', help="Always parse exports, ignoring the parsed-export cache")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Time every stage and write out_dir/{audit_profile.REPORT_FILE_NAME}")
+    parser.add_argument('--profile-cprofile', action='store_true',
+                        help="With --profile, add the slowest functions (cProfile; slows the run down)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="With --profile, add allocations and peak memory per stage (tracemalloc; slower)")
+    args = parser.parse_args(argv)
+    extra_formats = [name for name in ('eml', 'mbox', 'jsonl', 'csv') if getattr(args, name)]
+    profile_options = (args.profile_cprofile, args.profile_memory) if args.profile else None
+    return run_batch(args.zips, args.out, args.cache_stats, args.cache_dir, not args.no_cache,
+                     args.jobs, args.cache_size, extra_formats, args.templates, profile_options)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
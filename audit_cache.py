@@ -0,0 +1,143 @@
+"""On-disk cache of parsed and grouped exports, so reopening an unchanged ZIP skips parsing
+
+An entry is a pickled dict keyed by export_key(zip_path):
+    'rooftops', 'csm_rooftops'  the grouped structures from audit_core
+    'encodings'                 {lowercase file name: codec used}
+The desktop app, which also shows the raw rows, stores the export's
+{member: (rows, encoding)} in a separate members file next to the entry,
+so batch mode and cache lookups never unpickle the raw rows.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import zipfile
+
+
+# Bump when the cached structures change shape, so older entries are ignored
+CACHE_VERSION = 4
+
+# Entries kept, and total size of the cache directory's files; the least
+# recently used entries (with their members files) beyond either are deleted
+CACHE_MAX_ENTRIES = 32
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+CACHE_SUFFIX = '.pickle'
+MEMBERS_SUFFIX = '.members' + CACHE_SUFFIX
+
+
+def default_cache_dir():
+    """Per-user cache directory (overridable with AUDIT_TEMPLATE_CACHE_DIR)"""
+    override = os.environ.get('AUDIT_TEMPLATE_CACHE_DIR')
+    if override:
+        return override
+    base = (os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'audit_template')
+
+
+def export_key(zip_path):
+    """Content key for a ZIP, from each member's name, size and CRC-32
+
+    Only the ZIP's central directory is read, so keying a large export costs
+    nothing, yet any change to a member's bytes changes its CRC and the key.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"v{CACHE_VERSION}\n".encode())
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            digest.update(f"{info.filename}\0{info.file_size}\0{info.CRC}\n".encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+
+class ExportCache:
+    """A directory of pickled export entries
+
+    Cache trouble (unwritable directory, corrupt or stale file) is never
+    fatal: load() reports a miss and save() gives up quietly.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def members_path(self, key):
+        return os.path.join(self.cache_dir, key + MEMBERS_SUFFIX)
+
+    def read(self, path):
+        """Unpickle a dict from path, or None"""
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            # Mark as recently used for pruning
+            os.utime(path)
+        except Exception:
+            return None
+        return value if isinstance(value, dict) else None
+
+    def write(self, path, value):
+        """Pickle value to path through a temporary file, so a reader never sees half of it"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def load(self, key):
+        """Return the entry stored under key, or None"""
+        return self.read(self.path(key))
+
+    def load_members(self, key):
+        """Return the raw {member: (rows, encoding)} stored under key, or None"""
+        return self.read(self.members_path(key))
+
+    def save(self, key, entry, members=None):
+        """Store entry under key, and members in their own file if given
+
+        Returns whether everything was written.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if members is not None:
+                self.write(self.members_path(key), members)
+            self.write(self.path(key), entry)
+        except Exception:
+            return False
+
+        self.prune()
+        return True
+
+    def prune(self):
+        """Delete the least recently used entries beyond max_entries or max_bytes
+
+        An entry and its members file are kept or deleted together.
+        """
+        try:
+            groups = {}  # key -> [newest mtime, total size, paths]
+            for file in os.scandir(self.cache_dir):
+                if not file.name.endswith(CACHE_SUFFIX):
+                    continue
+                key = file.name.split('.', 1)[0]
+                stat = file.stat()
+                group = groups.setdefault(key, [0.0, 0, []])
+                group[0] = max(group[0], stat.st_mtime)
+                group[1] += stat.st_size
+                group[2].append(file.path)
+
+            kept = 0
+            total = 0
+            for mtime, size, paths in sorted(groups.values(), key=lambda group: group[0], reverse=True):
+                kept += 1
+                total += size
+                if kept > self.max_entries or total > self.max_bytes:
+                    for path in paths:
+                        os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,182 @@
+"""Bulk export of templates as RFC 5322 .eml files or a single mbox, and of
+the grouped rooftop and CSM data as JSON Lines or CSV
+
+Messages and records are built and written one at a time, so exporting
+thousands of templates never holds more than one of them in memory. The .eml
+files carry X-Unsent: 1, which makes Outlook open them as drafts ready to
+address and send.
+
+Data files written by write_data():
+    rooftops.jsonl       one object per rooftop, with its lines
+    csm_rooftops.jsonl   one object per CSM, with included and skipped rooftops
+    rooftop_lines.csv    one row per line (ROOFTOP_LINE_FIELDS)
+    csm_rooftops.csv     one row per rooftop per CSM (CSM_ROOFTOP_FIELDS)
+"""
+import csv
+import email.policy
+import email.utils
+import json
+import os
+import re
+import time
+from email.generator import BytesGenerator
+from email.message import EmailMessage
+
+import audit_core
+
+
+# Characters that can't appear in a file name on Windows (plus control characters)
+UNSAFE_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]+')
+
+# File name stems are cut to this length, before the .eml suffix
+MAX_STEM_LENGTH = 80
+
+# Columns of the flattened CSV data files
+ROOFTOP_LINE_FIELDS = ('rooftop_name', 'inbox_name') + audit_core.LineRecord.__slots__
+CSM_ROOFTOP_FIELDS = ('csm_owner', 'status', 'rooftop_name', 'inbox_name')
+
+DATA_FORMATS = ('jsonl', 'csv')
+
+
+def dealership_emails(renderer, cache=True):
+    """(file stem, subject, body) for every dealership template, rendered as needed"""
+    for number, rooftop_name in enumerate(renderer.rooftops, 1):
+        yield (f"{number:04d} {rooftop_name}", renderer.subject_line(rooftop_name),
+               renderer.dealership(rooftop_name, cache))
+
+
+def csm_emails(renderer, cache=True):
+    """(file stem, subject, body) for every CSM template, rendered as needed"""
+    if renderer.csm_rooftops is None:
+        return
+    for number, csm_owner in enumerate(renderer.csm_owners(), 1):
+        yield (f"CSM {number:04d} {csm_owner}", renderer.csm_subject_line(csm_owner),
+               renderer.csm(csm_owner, cache))
+
+
+def build_message(subject, body, sender=None):
+    """An unsent plain-text email; From is left for the mail client unless sender is given"""
+    message = EmailMessage()
+    if sender:
+        message['From'] = sender
+    message['Subject'] = subject
+    message['Date'] = email.utils.formatdate(localtime=True)
+    message['X-Unsent'] = '1'
+    message.set_content(body)
+    return message
+
+
+def safe_filename(stem):
+    """Turn a rooftop or CSM name into a portable file name stem"""
+    stem = UNSAFE_FILENAME_CHARS.sub('_', stem).strip(' .')
+    return stem[:MAX_STEM_LENGTH].rstrip(' .') or 'template'
+
+
+def write_eml_files(emails, out_dir, sender=None):
+    """Write each (stem, subject, body) as out_dir/<stem>.eml, returning the count"""
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for stem, subject, body in emails:
+        path = os.path.join(out_dir, safe_filename(stem) + '.eml')
+        with open(path, 'wb') as f:
+            # .eml files use CRLF line endings, as on the wire
+            BytesGenerator(f, policy=email.policy.SMTP).flatten(build_message(subject, body, sender))
+        count += 1
+    return count
+
+
+def write_mbox(emails, path, sender=None):
+    """Append each (stem, subject, body) to an mbox file at path, returning the count"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    count = 0
+    with open(path, 'wb') as f:
+        # mangle_from_ escapes body lines starting with "From " so they can't split a message
+        generator = BytesGenerator(f, mangle_from_=True, policy=email.policy.default)
+        for _, subject, body in emails:
+            f.write(f"From MAILER-DAEMON {time.asctime()}\n".encode('ascii'))
+            generator.flatten(build_message(subject, body, sender))
+            f.write(b"\n")
+            count += 1
+    return count
+
+
+def rooftop_records(rooftops):
+    """One JSON-ready dict per rooftop, lines included"""
+    for rooftop_name, data in rooftops.items():
+        yield {
+            'rooftop_name': rooftop_name,
+            'inbox_name': data['inbox_name'],
+            'lines': [line.as_dict() for line in data['lines']],
+        }
+
+
+def csm_records(csm_rooftops):
+    """One JSON-ready dict per CSM owner"""
+    for csm_owner, data in csm_rooftops.items():
+        yield {'csm_owner': csm_owner, 'included': data['included'], 'skipped': data['skipped']}
+
+
+def rooftop_line_rows(rooftops):
+    """One ROOFTOP_LINE_FIELDS row per line"""
+    for rooftop_name, data in rooftops.items():
+        inbox_name = data['inbox_name']
+        for line in data['lines']:
+            yield (rooftop_name, inbox_name, line.display_name, line.phone_number,
+                   line.raw_display_name, line.raw_name, line.desk_phone, line.desk_phone_score,
+                   line.suggested_desk_phone, line.suggested_desk_phone_score)
+
+
+def csm_rooftop_rows(csm_rooftops):
+    """One CSM_ROOFTOP_FIELDS row per rooftop per CSM; skipped rooftops have no inbox"""
+    for csm_owner, data in csm_rooftops.items():
+        for rooftop in data['included']:
+            yield (csm_owner, 'included', rooftop['rooftop_name'], rooftop['inbox_name'])
+        for rooftop_name in data['skipped']:
+            yield (csm_owner, 'skipped', rooftop_name, '')
+
+
+def write_jsonl(records, path):
+    """Write each record as one line of JSON, returning the count"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def write_csv(fields, rows, path):
+    """Write a header and each row as UTF-8 CSV, returning the row count"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_data(rooftops, csm_rooftops, out_dir, formats=DATA_FORMATS):
+    """Write the grouped data to out_dir in each of formats ('jsonl', 'csv')
+
+    csm_rooftops may be None when there was no rooftop_information.csv; the
+    CSM files are then left out. Returns the paths written.
+    """
+    paths = []
+    if 'jsonl' in formats:
+        paths.append(os.path.join(out_dir, 'rooftops.jsonl'))
+        write_jsonl(rooftop_records(rooftops), paths[-1])
+        if csm_rooftops is not None:
+            paths.append(os.path.join(out_dir, 'csm_rooftops.jsonl'))
+            write_jsonl(csm_records(csm_rooftops), paths[-1])
+    if 'csv' in formats:
+        paths.append(os.path.join(out_dir, 'rooftop_lines.csv'))
+        write_csv(ROOFTOP_LINE_FIELDS, rooftop_line_rows(rooftops), paths[-1])
+        if csm_rooftops is not None:
+            paths.append(os.path.join(out_dir, 'csm_rooftops.csv'))
+            write_csv(CSM_ROOFTOP_FIELDS, csm_rooftop_rows(csm_rooftops), paths[-1])
+    return paths
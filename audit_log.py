@@ -0,0 +1,156 @@
+"""Terminal dumps and template logging for the desktop app
+
+Two loggers replace the app's print() echoes:
+    audit_template.dump       raw CSV tables on stdout, only when asked for,
+                              capped to the first dump_rows rows of each file
+    audit_template.templates  every generated template, written to a log file
+
+The log file is written by a QueueListener thread, so the thread generating
+templates only queues records and never waits on disk or console I/O.
+"""
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+import audit_cache
+
+
+DUMP_LOGGER = 'audit_template.dump'
+TEMPLATE_LOGGER = 'audit_template.templates'
+
+# Rows dumped per CSV with --verbose
+DEFAULT_DUMP_ROWS = 20
+
+# Column widths come from the header and this many rows, not the whole file
+WIDTH_SAMPLE_ROWS = 200
+
+# Widest a dumped column gets
+MAX_COLUMN_WIDTH = 40
+
+LOG_FILE_NAME = 'audit_template.log'
+
+# The template log is rotated at this size, keeping LOG_BACKUPS older files
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 2
+
+RULE = "=" * 80
+
+dump_log = logging.getLogger(DUMP_LOGGER)
+template_log = logging.getLogger(TEMPLATE_LOGGER)
+
+
+def default_log_path():
+    """Template log next to the parsed-export cache"""
+    return os.path.join(audit_cache.default_cache_dir(), LOG_FILE_NAME)
+
+
+def configure(log_path=None, templates=True):
+    """Attach handlers to both loggers, returning the QueueListener to stop at exit
+
+    Dumps go straight to stdout (they are off unless dump_table() is given a
+    row limit). Template echoes go to log_path (default: default_log_path())
+    through a queue; with templates=False, or if the log directory can't be
+    created, they are dropped and never rendered. Returns None when there is
+    no listener to stop.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    dump_log.addHandler(handler)
+    dump_log.setLevel(logging.INFO)
+    dump_log.propagate = False
+
+    template_log.propagate = False
+    if not templates:
+        template_log.setLevel(logging.CRITICAL + 1)
+        return None
+
+    log_path = log_path or default_log_path()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+    except OSError:
+        template_log.setLevel(logging.CRITICAL + 1)
+        return None
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8', delay=True
+    )
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+    log_queue = queue.SimpleQueue()
+    template_log.addHandler(logging.handlers.QueueHandler(log_queue))
+    template_log.setLevel(logging.INFO)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    return listener
+
+
+def format_table(rows, max_rows, sample_rows=WIDTH_SAMPLE_ROWS):
+    """The header and first max_rows data rows as aligned text
+
+    Column widths are measured on the header and the first sample_rows data
+    rows only, so formatting cost doesn't grow with the file.
+    """
+    header = rows[0]
+    sample = rows[:sample_rows + 1]
+    col_widths = [
+        min(max((len(row[i]) for row in sample if i < len(row)), default=0), MAX_COLUMN_WIDTH)
+        for i in range(len(header))
+    ]
+
+    def format_row(row):
+        return " | ".join(
+            row[i][:width].ljust(width) if i < len(row) else " " * width
+            for i, width in enumerate(col_widths)
+        )
+
+    header_line = format_row(header)
+    lines = [header_line, "-" * len(header_line)]
+    lines.extend(format_row(row) for row in rows[1:max_rows + 1])
+    return "\n".join(lines)
+
+
+def dump_table(filename, rows, max_rows):
+    """Dump a CSV's first max_rows rows to the terminal; nothing when max_rows is 0"""
+    if max_rows <= 0 or not dump_log.isEnabledFor(logging.INFO):
+        return
+
+    parts = ["\n" + RULE, f"CSV FILE: {os.path.basename(filename)}", RULE]
+    if not rows:
+        parts.append("(Empty file)")
+    else:
+        parts.append(format_table(rows, max_rows))
+        shown = min(max_rows, len(rows) - 1)
+        parts.append(f"\nTotal rows: {len(rows) - 1}" + (f" (first {shown} shown)" if shown < len(rows) - 1 else ""))
+    parts.append(RULE + "\n")
+    dump_log.info("\n".join(parts))
+
+
+def log_heading(title):
+    template_log.info("\n".join(["", RULE, f"{title} ({time.strftime('%Y-%m-%d %H:%M:%S')})", RULE, ""]))
+
+
+def log_dealership_templates(renderer):
+    """Write the dealership templates to the template log"""
+    if not template_log.isEnabledFor(logging.INFO):
+        return
+
+    log_heading("GENERATED EMAIL TEMPLATES")
+    for rooftop_name in renderer.rooftops:
+        template_log.info(renderer.dealership(rooftop_name) + "\n" + RULE + "\n")
+
+
+def log_csm_templates(renderer):
+    """Write the CSM templates to the template log"""
+    if not template_log.isEnabledFor(logging.INFO):
+        return
+
+    log_heading("GENERATED CSM TEMPLATES")
+    for csm_owner in renderer.csm_owners():
+        skipped_list = renderer.csm_rooftops[csm_owner]['skipped']
+        text = renderer.csm(csm_owner)
+        if skipped_list:
+            text += f"\n  [Skipped {len(skipped_list)} rooftop(s) - not in lines file: {', '.join(skipped_list)}]"
+        template_log.info(text + "\n" + RULE + "\n")
@@ -0,0 +1,282 @@
+"""Per-stage profiling for the desktop app and batch mode
+
+Pipeline code wraps its stages in span('name'), which costs nothing unless
+a profile is running. start() begins one and finish() ends it, returning
+(and optionally writing) a report with, for every stage:
+
+    calls, wall time, and CPU time of the thread that ran it
+    with memory=True: net bytes allocated and peak traced memory (tracemalloc)
+
+followed, with cprofile=True, by the functions with the most cumulative time
+and, with memory=True, the source lines holding the most memory at the end.
+Spans nest (the report indents inner stages, in the order they started) and
+may run on any thread; a span opened on a helper thread names its parent
+stage to be indented under it.
+Batch workers send their profile back with export() for the parent to
+merge().
+
+cProfile, pstats and tracemalloc are only imported once a profile starts,
+so importing this module (as audit_core does) adds nothing to startup.
+"""
+import contextlib
+import os
+import sys
+import threading
+import time
+
+
+REPORT_FILE_NAME = 'profile_report.txt'
+
+# Functions listed in the cProfile section
+PROFILE_TOP_FUNCTIONS = 30
+
+# Source lines listed in the memory section
+MEMORY_TOP_LINES = 15
+
+NULL_SPAN = contextlib.nullcontext()
+
+# The running Profile, if any
+active = None
+
+
+class StatsData:
+    """Raw cProfile stats in the shape pstats.Stats() loads from"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class Profile:
+    """Timing spans, and optionally cProfile and tracemalloc data, for one run"""
+
+    def __init__(self, cprofile=False, memory=False):
+        self.cprofile = cprofile
+        self.memory = memory
+        self.stages = {}  # stage -> {'depth', 'calls', 'wall', 'cpu', 'allocated', 'peak'}, first seen first
+        self.notes = []
+        self.profiles = []  # finished cProfile.Profile objects and StatsData from workers
+        self.memory_top = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.wall = None
+        self.cpu = None
+        if memory:
+            import tracemalloc
+            tracemalloc.start()
+
+    def note(self, text):
+        """Add a line to the report header (input files, sizes, options)"""
+        self.notes.append(text)
+
+    @contextlib.contextmanager
+    def span(self, name, parent=None):
+        """Time the enclosed block as stage name, nested under parent if given"""
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        with self.lock:
+            depth = self.stages[parent]['depth'] + 1 if parent in self.stages else 0
+            self.add(name, depth + len(stack), 0, 0.0, 0.0, None, None)
+
+        profiler = None
+        if self.cprofile and not stack:
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another thread's profiler is active; from Python 3.12 it covers this thread too
+                profiler = None
+
+        frame = {'peak': 0, 'current': 0}
+        if self.memory:
+            import tracemalloc
+            frame['current'], peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+        stack.append(frame)
+
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            stack.pop()
+
+            allocated = peak = None
+            if self.memory and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(frame['peak'], peak)
+                allocated = current - frame['current']
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+
+            if profiler is not None:
+                profiler.disable()
+            with self.lock:
+                if profiler is not None:
+                    self.profiles.append(profiler)
+                self.add(name, depth + len(stack), 1, wall, cpu, allocated, peak)
+
+    def add(self, name, depth, calls, wall, cpu, allocated, peak):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'depth': depth, 'calls': 0, 'wall': 0.0, 'cpu': 0.0,
+                                         'allocated': None, 'peak': None}
+        stage['calls'] += calls
+        stage['wall'] += wall
+        stage['cpu'] += cpu
+        if allocated is not None:
+            stage['allocated'] = (stage['allocated'] or 0) + allocated
+        if peak is not None:
+            stage['peak'] = max(stage['peak'] or 0, peak)
+
+    def stop(self):
+        """Stop measuring; the report covers everything up to here"""
+        if self.wall is not None:
+            return
+        self.wall = time.perf_counter() - self.wall_start
+        self.cpu = time.process_time() - self.cpu_start
+        if self.memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                statistics = tracemalloc.take_snapshot().statistics('lineno')
+                self.memory_top.extend((str(stat.traceback), stat.size, stat.count)
+                                       for stat in statistics[:MEMORY_TOP_LINES])
+                tracemalloc.stop()
+
+    def cprofile_stats(self):
+        """Merged raw cProfile stats, or None"""
+        if not self.profiles:
+            return None
+        import pstats
+        stats = pstats.Stats(self.profiles[0])
+        for profile in self.profiles[1:]:
+            stats.add(profile)
+        return stats.stats
+
+    def export(self):
+        """The profile as plain picklable data, for merge() in another process"""
+        self.stop()
+        return {
+            'stages': self.stages,
+            'cprofile': self.cprofile_stats(),
+            'memory_top': self.memory_top,
+        }
+
+    def merge(self, exported):
+        """Add a profile exported by a worker process (stage times are summed)"""
+        with self.lock:
+            for name, stage in exported['stages'].items():
+                self.add(name, stage['depth'], stage['calls'], stage['wall'], stage['cpu'],
+                         stage['allocated'], stage['peak'])
+            if exported['cprofile']:
+                self.profiles.append(StatsData(exported['cprofile']))
+            self.memory_top.extend(exported['memory_top'])
+
+    def report(self):
+        """The report text"""
+        import io
+        import platform
+        import pstats
+        self.stop()
+        lines = [
+            f"Profile report, {time.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"Python {sys.version.split()[0]} on {platform.platform()}, {os.cpu_count()} CPU(s)",
+        ]
+        lines.extend(self.notes)
+        lines.append(f"Total: {self.wall:.3f} s wall, {self.cpu:.3f} s CPU (this process)")
+        lines.append("")
+
+        lines.append(f"{'Stage':<32} {'Calls':>6} {'Wall (s)':>10} {'CPU (s)':>10} {'Alloc MB':>10} {'Peak MB':>10}")
+        lines.append("-" * 83)
+        for name, stage in self.stages.items():
+            label = ("  " * stage['depth'] + name)[:32]
+            allocated = f"{stage['allocated'] / 1e6:10.1f}" if stage['allocated'] is not None else f"{'-':>10}"
+            peak = f"{stage['peak'] / 1e6:10.1f}" if stage['peak'] is not None else f"{'-':>10}"
+            lines.append(f"{label:<32} {stage['calls']:>6} {stage['wall']:10.3f} {stage['cpu']:10.3f} {allocated} {peak}")
+        lines.append("")
+        lines.append("Wall and CPU times of nested stages are included in their parents'. "
+                     "CPU time is that of the thread running the stage.")
+
+        stats = self.cprofile_stats()
+        if stats:
+            output = io.StringIO()
+            pstats.Stats(StatsData(stats), stream=output).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+            lines.append("")
+            lines.append(f"Top {PROFILE_TOP_FUNCTIONS} functions by cumulative time (cProfile)")
+            lines.append(output.getvalue().strip("\n"))
+
+        if self.memory_top:
+            lines.append("")
+            lines.append("Memory still held at the end, by source line (tracemalloc)")
+            for where, size, count in sorted(self.memory_top, key=lambda item: item[1], reverse=True)[:MEMORY_TOP_LINES]:
+                lines.append(f"{size / 1e6:10.2f} MB {count:>9,} blocks  {where}")
+        return "\n".join(lines) + "\n"
+
+
+def start(cprofile=False, memory=False):
+    """Begin a new profile, replacing any running one, and return it"""
+    global active
+    if active is not None:
+        active.stop()
+    active = Profile(cprofile, memory)
+    return active
+
+
+def span(name, parent=None):
+    """Context manager timing a stage of the running profile (a no-op without one)"""
+    profile = active
+    return profile.span(name, parent) if profile is not None else NULL_SPAN
+
+
+def note(text):
+    """Add a header line to the running profile's report"""
+    if active is not None:
+        active.note(text)
+
+
+def finish(path=None):
+    """End the running profile and return its report, writing it to path if given
+
+    Returns None if no profile was running.
+    """
+    global active
+    profile, active = active, None
+    if profile is None:
+        return None
+    text = profile.report()
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+    return text
+
+
+def cancel():
+    """End the running profile, if any, without a report"""
+    global active
+    profile, active = active, None
+    if profile is not None:
+        profile.stop()
+
+
+def export():
+    """End the running profile and return it as data for merge()"""
+    global active
+    profile, active = active, None
+    return profile.export() if profile is not None else None
+
+
+def merge(exported):
+    """Merge a worker's exported profile into the running one"""
+    if active is not None and exported is not None:
+        active.merge(exported)
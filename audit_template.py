@@ -1,15 +1,264 @@
+import time
+
+# When this module started loading, for --startup-time
+LOAD_START = time.perf_counter()
+
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, scrolledtext
+from tkinter import ttk
+import argparse
 import zipfile
-import csv
-import io
 import os
-from collections import defaultdict
+import queue
+import threading
+
+# Dialogs, scrolledtext and audit_export are imported where they are first
+# used, so the window doesn't wait on modules most sessions never touch
+import audit_cache
+import audit_core
+import audit_log
+import audit_profile
+
+
+# How often the Tk loop checks the background job for progress (ms)
+JOB_POLL_MS = 100
+
+# Fixed row height of the raw CSV tables, so visible rows can be counted
+RAW_ROW_HEIGHT = 22
+
+# Heading height assumed until the table has been drawn
+RAW_HEADER_HEIGHT = 25
+
+# Rows moved per mouse wheel notch in the raw CSV tables
+RAW_WHEEL_ROWS = 3
+
+# Pause in typing before a raw CSV search runs (ms)
+SEARCH_DEBOUNCE_MS = 250
+
+# Padding around template cards in the card lists
+CARD_PADX = 20
+CARD_PADY = 10
+
+# Cards built beyond each edge of the viewport, so short scrolls don't flash
+CARD_OVERSCAN = 2
+
+
+class VirtualTable:
+    """Treeview that only materialises the rows currently in view
+
+    The tree holds one item per visible line. Scrolling rewrites those items'
+    values from the row list instead of inserting an item per row, so a
+    200k-row CSV opens as fast as a 20-row one.
+    """
+
+    def __init__(self, parent, headers):
+        self.headers = headers
+        self.rows = []
+        self.offset = 0
+        self.slots = []
+        self.header_height = RAW_HEADER_HEIGHT
+
+        self.frame = ttk.Frame(parent)
+
+        # Vertical scrollbar drives the row offset; horizontal scrolls the tree as usual
+        self.vsb = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        hsb = ttk.Scrollbar(self.frame, orient="horizontal")
+
+        columns = [f"c{idx}" for idx in range(len(headers))]
+        self.tree = ttk.Treeview(
+            self.frame,
+            columns=columns,
+            show="headings",
+            style="Raw.Treeview",
+            xscrollcommand=hsb.set
+        )
+        hsb.config(command=self.tree.xview)
+
+        for column, header in zip(columns, headers):
+            self.tree.heading(column, text=header)
+            self.tree.column(column, width=150, minwidth=50)
+
+        # Grid layout
+        self.tree.grid(row=0, column=0, sticky=(tk.N, tk.S, tk.E, tk.W))
+        self.vsb.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        hsb.grid(row=1, column=0, sticky=(tk.E, tk.W))
+
+        self.frame.columnconfigure(0, weight=1)
+        self.frame.rowconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-RAW_WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(RAW_WHEEL_ROWS))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.page_size()))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.page_size()))
+
+    def set_rows(self, rows):
+        """Show a new list of data rows, scrolled to the top"""
+        self.rows = rows
+        self.offset = 0
+        self.refresh()
+
+    def page_size(self):
+        """Number of rows fully in view"""
+        return max(1, len(self.slots) - 1)
+
+    def max_offset(self):
+        return max(0, len(self.rows) - self.page_size())
+
+    def scroll(self, count):
+        self.offset = min(max(self.offset + count, 0), self.max_offset())
+        self.refresh()
+        return "break"
+
+    def yview(self, *args):
+        """Scrollbar command: 'moveto fraction' or 'scroll n units|pages'"""
+        if args[0] == 'moveto':
+            self.offset = min(max(int(float(args[1]) * len(self.rows)), 0), self.max_offset())
+            self.refresh()
+        elif args[0] == 'scroll':
+            count = int(args[1])
+            if args[2] == 'pages':
+                count *= self.page_size()
+            self.scroll(count)
+
+    def on_wheel(self, event):
+        return self.scroll(-RAW_WHEEL_ROWS if event.delta > 0 else RAW_WHEEL_ROWS)
+
+    def on_resize(self, event):
+        """Keep one tree item per row that fits in the widget"""
+        if self.slots:
+            bbox = self.tree.bbox(self.slots[0])
+            if bbox:
+                self.header_height = bbox[1]
+
+        wanted = max(1, -(-(event.height - self.header_height) // RAW_ROW_HEIGHT))
+        while len(self.slots) < wanted:
+            self.slots.append(self.tree.insert("", tk.END, values=()))
+        if len(self.slots) > wanted:
+            self.tree.delete(*self.slots[wanted:])
+            del self.slots[wanted:]
+
+        self.offset = min(self.offset, self.max_offset())
+        self.refresh()
+
+    def refresh(self):
+        """Write the rows at the current offset into the tree items"""
+        width = len(self.headers)
+        # Slots are reused for other rows, so a selection would jump around
+        self.tree.selection_remove(self.tree.selection())
+
+        for idx, item_id in enumerate(self.slots):
+            row_idx = self.offset + idx
+            if row_idx < len(self.rows):
+                row = self.rows[row_idx]
+                # Ensure row has same length as headers
+                values = row[:width] + [''] * (width - len(row))
+                self.tree.item(item_id, values=values)
+            else:
+                self.tree.item(item_id, values=())
+
+        if self.rows:
+            self.vsb.set(self.offset / len(self.rows),
+                         min(1.0, (self.offset + self.page_size()) / len(self.rows)))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+
+class LazyCardList:
+    """Scrollable list of same-height cards that only builds widgets near the viewport
+
+    make_card(parent) builds one empty card (a dict with at least a 'frame').
+    Cards are pooled and rebound to other items as the list scrolls:
+    unbind_card(card, index) runs first so edits can be saved back to the
+    item data, then bind_card(card, index) fills the card in.
+    """
+
+    def __init__(self, parent, count, make_card, bind_card, unbind_card, bg):
+        self.count = count
+        self.make_card = make_card
+        self.bind_card = bind_card
+        self.unbind_card = unbind_card
+        self.card_height = None
+        self.measuring = False
+        self.pool = []
+
+        self.canvas = tk.Canvas(parent, bg=bg, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def on_resize(self, event):
+        for entry in self.pool:
+            self.canvas.itemconfigure(entry['window'], width=max(1, event.width - 2 * CARD_PADX))
+        self.refresh()
+
+    def new_entry(self):
+        """Build another pooled card"""
+        card = self.make_card(self.canvas)
+        window = self.canvas.create_window(CARD_PADX, CARD_PADY, window=card['frame'], anchor="nw",
+                                           width=max(1, self.canvas.winfo_width() - 2 * CARD_PADX))
+        entry = {'card': card, 'window': window, 'index': None}
+        self.pool.append(entry)
+        return entry
+
+    def refresh(self):
+        """Bind pooled cards to the items in (or near) view"""
+        if self.count == 0:
+            return
+
+        if self.card_height is None:
+            # update_idletasks can call back into refresh through on_scroll
+            if self.measuring:
+                return
+            self.measuring = True
+
+            # All cards have the same layout, so measure the first one
+            entry = self.new_entry()
+            self.bind_card(entry['card'], 0)
+            entry['index'] = 0
+            self.canvas.update_idletasks()
+            self.card_height = entry['card']['frame'].winfo_reqheight() + 2 * CARD_PADY
+            self.measuring = False
+            self.canvas.configure(scrollregion=(0, 0, 0, self.count * self.card_height),
+                                  yscrollincrement=self.card_height // 4)
+
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // self.card_height) - CARD_OVERSCAN)
+        last = min(self.count, int((top + self.canvas.winfo_height()) // self.card_height) + 1 + CARD_OVERSCAN)
+        wanted = range(first, last)
+
+        bound = {entry['index'] for entry in self.pool if entry['index'] in wanted}
+        free = [entry for entry in self.pool if entry['index'] not in wanted]
+
+        for index in wanted:
+            if index in bound:
+                continue
+            entry = free.pop() if free else self.new_entry()
+            if entry['index'] is not None:
+                self.unbind_card(entry['card'], entry['index'])
+            self.bind_card(entry['card'], index)
+            entry['index'] = index
+            self.canvas.coords(entry['window'], CARD_PADX, index * self.card_height + CARD_PADY)
+
+    def save_bound(self):
+        """Save edits in the cards currently built back to the item data"""
+        for entry in self.pool:
+            if entry['index'] is not None:
+                self.unbind_card(entry['card'], entry['index'])
 
 
 class ZipCSVReaderApp:
-    def __init__(self, root):
+    def __init__(self, root, dump_rows=0, profile_options=None, profile_report_path=None):
         self.root = root
+        # Rows of each loaded CSV dumped to the terminal (0 for none)
+        self.dump_rows = dump_rows
         self.root.title("Audit Template Generator")
         self.root.geometry("1200x800")
 
@@ -31,29 +280,6 @@ class ZipCSVReaderApp:
         # Configure Frame style
         style.configure("Modern.TFrame", background=self.bg_color)
 
-        # Configure Button style
-        style.configure("Modern.TButton",
-                       padding=10,
-                       relief="flat",
-                       background=self.primary_color,
-                       foreground="white",
-                       borderwidth=0,
-                       focuscolor="none")
-        style.map("Modern.TButton",
-                 background=[("active", self.secondary_color),
-                            ("pressed", self.accent_color)])
-
-        # Configure Label style
-        style.configure("Modern.TLabel",
-                       background=self.bg_color,
-                       foreground=self.text_color,
-                       font=("Segoe UI", 10))
-
-        style.configure("Title.TLabel",
-                       background=self.bg_color,
-                       foreground=self.accent_color,
-                       font=("Segoe UI", 14, "bold"))
-
         # Configure Notebook style
         style.configure("Modern.TNotebook",
                        background=self.bg_color,
@@ -69,6 +295,7 @@ class ZipCSVReaderApp:
 
         # Create main frame
         main_frame = ttk.Frame(root, padding="20", style="Modern.TFrame")
+        self.main_frame = main_frame
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
         # Configure grid weight
@@ -132,7 +359,7 @@ class ZipCSVReaderApp:
         # Browse button with modern style
         self.browse_button = tk.Button(
             button_container,
-            text="Browse for ZIP or CSV file",
+            text="Browse for ZIP or CSV file(s)",
             command=self.browse_file,
             font=("Segoe UI", 11, "bold"),
             bg=self.primary_color,
@@ -147,6 +374,22 @@ class ZipCSVReaderApp:
         )
         self.browse_button.pack(pady=8)
 
+        # Folder button for loading every CSV in a directory at once
+        self.browse_folder_button = tk.Button(
+            button_container,
+            text="Open a folder of CSV files",
+            command=self.browse_folder,
+            font=("Segoe UI", 9),
+            bg="white",
+            fg=self.primary_color,
+            activebackground="white",
+            activeforeground=self.secondary_color,
+            relief=tk.FLAT,
+            borderwidth=0,
+            cursor="hand2"
+        )
+        self.browse_folder_button.pack()
+
         # Current file label
         self.current_file_label = tk.Label(
             button_container,
@@ -185,10 +428,11 @@ class ZipCSVReaderApp:
         )
         self.csv_toggle_btn.pack(fill=tk.X)
 
-        # CSV notebook (hidden by default)
-        self.csv_notebook_frame = tk.Frame(main_frame, bg=self.bg_color)
-        self.csv_notebook = ttk.Notebook(self.csv_notebook_frame, style="Modern.TNotebook")
-        self.csv_notebook.pack(fill=tk.BOTH, expand=True)
+        # CSV notebook, built the first time the section is opened; until then
+        # loaded files wait in pending_csv_tabs (tab text -> create function)
+        self.csv_notebook_frame = None
+        self.csv_notebook = None
+        self.pending_csv_tabs = {}
 
         # Status bar with modern style
         status_frame = tk.Frame(main_frame, bg=self.bg_color)
@@ -207,6 +451,49 @@ class ZipCSVReaderApp:
         )
         self.status_label.pack(fill=tk.X)
 
+        # Cancel button, shown in the status bar while a file is being processed
+        self.cancel_button = tk.Button(
+            status_frame,
+            text="✕ Cancel",
+            command=self.cancel_job,
+            font=("Segoe UI", 9),
+            bg="#dfe4ea",
+            fg=self.text_color,
+            activebackground="#c8d6e5",
+            relief=tk.FLAT,
+            borderwidth=0,
+            padx=10,
+            cursor="hand2"
+        )
+
+        # Background processing state
+        self.job_queue = None
+        self.cancel_event = None
+
+        # Parsed exports from earlier runs, so reopening a ZIP skips parsing
+        self.export_cache = audit_cache.ExportCache()
+
+        # Profile menu: when on, each load writes a per-stage report (profile_options is (cprofile, memory))
+        cprofile, memory = profile_options or (False, False)
+        self.profile_var = tk.BooleanVar(value=profile_options is not None)
+        self.cprofile_var = tk.BooleanVar(value=cprofile)
+        self.memory_var = tk.BooleanVar(value=memory)
+        self.profile_report_path = profile_report_path or os.path.join(
+            audit_cache.default_cache_dir(), audit_profile.REPORT_FILE_NAME)
+        menubar = tk.Menu(self.root)
+        profile_menu = tk.Menu(menubar, tearoff=0)
+        profile_menu.add_checkbutton(label="Profile Loading", variable=self.profile_var)
+        profile_menu.add_checkbutton(label="Include Function Profile (cProfile)", variable=self.cprofile_var)
+        profile_menu.add_checkbutton(label="Include Memory (tracemalloc)", variable=self.memory_var)
+        profile_menu.add_separator()
+        profile_menu.add_command(label="Show Last Report", command=self.show_profile_report)
+        menubar.add_cascade(label="Profile", menu=profile_menu)
+        self.root.config(menu=menubar)
+
+        # Loaded input files and what was derived from them; dropping another
+        # CSV only recomputes what that file feeds
+        self.session = audit_core.Session()
+
         # Enable drag and drop using Windows-specific method
         self.setup_drag_drop()
 
@@ -219,10 +506,35 @@ class ZipCSVReaderApp:
             self.csv_expanded.set(False)
         else:
             # Expand
+            self.build_csv_notebook()
             self.csv_notebook_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
             self.csv_notebook_frame.configure(height=200)
             self.csv_toggle_btn.config(text="▼ Hide Raw CSV Data")
             self.csv_expanded.set(True)
+            self.show_pending_csv_tabs()
+
+    def build_csv_notebook(self):
+        """Create the raw CSV notebook on first use"""
+        if self.csv_notebook is not None:
+            return
+        # Fixed row height for VirtualTable
+        ttk.Style().configure("Raw.Treeview", rowheight=RAW_ROW_HEIGHT)
+        self.csv_notebook_frame = tk.Frame(self.main_frame, bg=self.bg_color)
+        self.csv_notebook = ttk.Notebook(self.csv_notebook_frame, style="Modern.TNotebook")
+        self.csv_notebook.pack(fill=tk.BOTH, expand=True)
+
+    def add_csv_tab(self, tab_text, create):
+        """Add or replace a raw CSV tab, now if the section is open or else when it is"""
+        if self.csv_expanded.get():
+            self.replace_tab(self.csv_notebook, tab_text, create)
+        else:
+            self.pending_csv_tabs[tab_text] = create
+
+    def show_pending_csv_tabs(self):
+        """Build the raw CSV tabs of files loaded while the section was closed"""
+        pending, self.pending_csv_tabs = self.pending_csv_tabs, {}
+        for tab_text, create in pending.items():
+            self.replace_tab(self.csv_notebook, tab_text, create)
 
     def setup_drag_drop(self):
         """Setup drag and drop functionality"""
@@ -236,119 +548,380 @@ class ZipCSVReaderApp:
 
     def browse_file(self, event=None):
         """Open file browser dialog"""
-        filename = filedialog.askopenfilename(
-            title="Select ZIP or CSV file",
+        from tkinter import filedialog
+        filenames = filedialog.askopenfilenames(
+            title="Select a ZIP file or CSV file(s)",
             filetypes=[("ZIP and CSV files", "*.zip *.csv"), ("ZIP files", "*.zip"), ("CSV files", "*.csv"), ("All files", "*.*")]
         )
-        if filename:
-            if filename.lower().endswith('.zip'):
-                self.process_zip_file(filename)
-            elif filename.lower().endswith('.csv'):
-                self.process_csv_files([filename])
-            else:
-                self.status_label.config(text="Please select a ZIP or CSV file")
+        if filenames:
+            self.open_paths(self.root.tk.splitlist(filenames))
+
+    def browse_folder(self):
+        """Open a directory and load every CSV file in it"""
+        from tkinter import filedialog
+        directory = filedialog.askdirectory(title="Select a folder of CSV files")
+        if directory:
+            self.open_paths([directory])
 
     def on_drop(self, event):
         """Handle file drop event"""
         try:
-            # Get the dropped file path
-            file_path = event.data
-            # Remove curly braces if present (Windows behavior)
-            file_path = file_path.strip('{}')
-
-            if file_path.lower().endswith('.zip'):
-                self.process_zip_file(file_path)
-            elif file_path.lower().endswith('.csv'):
-                self.process_csv_files([file_path])
-            else:
-                self.status_label.config(text="Please drop a ZIP or CSV file")
+            # Dropped paths arrive as a Tcl list, with {braces} around paths containing spaces
+            self.open_paths(self.root.tk.splitlist(event.data))
         except Exception as e:
             self.status_label.config(text=f"Error: {str(e)}")
 
-    def process_zip_file(self, zip_path):
-        """Process the dropped/selected zip file"""
-        try:
-            # Clear existing tabs from both notebooks
-            for tab in self.notebook.tabs():
-                self.notebook.forget(tab)
-            for tab in self.csv_notebook.tabs():
-                self.csv_notebook.forget(tab)
+    def open_paths(self, paths):
+        """Load dropped or selected files and directories in one run
 
-            self.status_label.config(text=f"Processing: {os.path.basename(zip_path)}")
-            self.current_file_label.config(text=f"Current file: {os.path.basename(zip_path)}")
+        CSV files (including those in dropped directories) are read together
+        and generate templates once. Otherwise the first ZIP is opened.
+        Skipped paths are listed in the status bar once loading finishes.
+        """
+        zip_paths, csv_paths, ignored = audit_core.expand_input_paths(paths)
 
-            # Store CSV data for template generation
-            csv_data = {}
+        if csv_paths:
+            self.process_csv_files(csv_paths, zip_paths + ignored)
+        elif zip_paths:
+            self.process_zip_file(zip_paths[0], zip_paths[1:] + ignored)
+        else:
+            self.status_label.config(text="Please select a ZIP or CSV file")
+
+    def skipped_note(self, skipped):
+        """Status bar suffix naming the paths open_paths did not load"""
+        if not skipped:
+            return ""
+        return (f" — skipped {len(skipped)} (open one ZIP, or any number of CSV files, at a time): "
+                + ", ".join(os.path.basename(path) for path in skipped))
+
+    def start_job(self, work, on_done):
+        """Run work(cancel_event, report) on a background thread
+
+        work must not touch Tk. It reports stage progress with report(text) and
+        its return value is handed to on_done on the Tk thread. Messages come
+        back through a queue polled with root.after, so the window stays
+        responsive. Starting a job cancels any job already running.
+        """
+        self.cancel_job()
+
+        job_queue = queue.Queue()
+        cancel_event = threading.Event()
+        self.job_queue = job_queue
+        self.cancel_event = cancel_event
+
+        def run():
+            try:
+                result = work(cancel_event, lambda text: job_queue.put(('status', text)))
+                job_queue.put(('done', result))
+            except audit_core.Cancelled:
+                job_queue.put(('cancelled', None))
+            except zipfile.BadZipFile:
+                job_queue.put(('error', "Error: Invalid ZIP file"))
+            except Exception as e:
+                job_queue.put(('error', f"Error: {str(e)}"))
+
+        threading.Thread(target=run, daemon=True).start()
+        self.cancel_button.pack(side=tk.RIGHT, before=self.status_label)
+        self.root.after(JOB_POLL_MS, self.poll_job, job_queue, on_done)
+
+    def poll_job(self, job_queue, on_done):
+        """Apply progress and results from the background job"""
+        # Ignore jobs that have been cancelled or replaced
+        if job_queue is not self.job_queue:
+            return
 
-            # Open and read the zip file
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                # Get all CSV files in the zip
-                csv_files = [f for f in zip_ref.namelist()
-                           if f.lower().endswith('.csv') and not f.startswith('__MACOSX')]
+        while True:
+            try:
+                kind, payload = job_queue.get_nowait()
+            except queue.Empty:
+                break
 
-                if not csv_files:
-                    self.status_label.config(text="No CSV files found in ZIP archive")
-                    return
+            if kind == 'status':
+                self.status_label.config(text=payload)
+                continue
 
-                # Process each CSV file
-                for csv_filename in csv_files:
-                    rows = self.display_csv(zip_ref, csv_filename)
-                    csv_data[os.path.basename(csv_filename).lower()] = rows
+            self.job_queue = None
+            self.cancel_event = None
+            self.cancel_button.pack_forget()
+            if kind == 'done':
+                on_done(payload)
+            elif kind == 'cancelled':
+                audit_profile.cancel()
+                self.status_label.config(text="Cancelled")
+            else:
+                audit_profile.cancel()
+                self.status_label.config(text=payload)
+            return
 
-                # Generate templates if we have the required files
-                self.generate_templates(csv_data)
+        self.root.after(JOB_POLL_MS, self.poll_job, job_queue, on_done)
 
-                self.status_label.config(
-                    text=f"✓ Loaded {len(csv_files)} CSV file(s) from {os.path.basename(zip_path)}"
-                )
+    def cancel_job(self):
+        """Cancel the running background job, keeping the current tabs"""
+        if self.cancel_event is None:
+            return
+        self.cancel_event.set()
+        audit_profile.cancel()
+        self.job_queue = None
+        self.cancel_event = None
+        self.cancel_button.pack_forget()
+        self.status_label.config(text="Cancelled")
+
+    def export_emails(self, emails, description):
+        """Ask for a folder and write (stem, subject, body) emails there as .eml drafts"""
+        from tkinter import filedialog
+        import audit_export
+        out_dir = filedialog.askdirectory(title=f"Export {description} as email drafts")
+        if not out_dir:
+            return
 
-        except zipfile.BadZipFile:
-            self.status_label.config(text="Error: Invalid ZIP file")
-        except Exception as e:
-            self.status_label.config(text=f"Error: {str(e)}")
+        def work(cancel_event, report):
+            report(f"Exporting {description}...")
+            return audit_export.write_eml_files(audit_core.cancellable(emails, cancel_event), out_dir)
 
-    def process_csv_files(self, csv_paths):
-        """Process standalone CSV files (not in a ZIP)"""
+        self.start_job(work, lambda count: self.status_label.config(
+            text=f"✓ Exported {count} {description} to {out_dir}"))
+
+    def export_data(self, renderer):
+        """Ask for a folder and write the grouped rooftop and CSM data there as JSON Lines and CSV"""
+        from tkinter import filedialog
+        import audit_export
+        out_dir = filedialog.askdirectory(title="Export grouped data as JSON Lines and CSV")
+        if not out_dir:
+            return
+
+        def work(cancel_event, report):
+            report("Exporting grouped data...")
+            return audit_export.write_data(renderer.rooftops, renderer.csm_rooftops, out_dir)
+
+        self.start_job(work, lambda paths: self.status_label.config(
+            text=f"✓ Exported {len(paths)} data file(s) to {out_dir}"))
+
+    def begin_profile(self, description, paths):
+        """Start profiling a load if the Profile menu says so (Tk thread)"""
+        if not self.profile_var.get():
+            audit_profile.cancel()
+            return
+        audit_profile.start(self.cprofile_var.get(), self.memory_var.get())
+        size = sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+        audit_profile.note(f"Input: {description}, {size / 1e6:.1f} MB")
+
+    def end_profile(self):
+        """Finish the load's profile, if any, and point the status bar at the report (Tk thread)"""
+        if audit_profile.active is None:
+            return
+        with audit_profile.span('Tk layout'):
+            self.root.update_idletasks()
         try:
-            # Clear existing tabs from both notebooks
-            for tab in self.notebook.tabs():
-                self.notebook.forget(tab)
+            audit_profile.finish(self.profile_report_path)
+        except OSError as e:
+            self.status_label.config(text=f"{self.status_label.cget('text')} (profile report not written: {e})")
+            return
+        self.status_label.config(text=f"{self.status_label.cget('text')} (profile report: {self.profile_report_path})")
+
+    def show_profile_report(self):
+        """Show the last profile report in its own window"""
+        try:
+            with open(self.profile_report_path, encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            self.status_label.config(text="No profile report yet: turn on Profile > Profile Loading and open a file")
+            return
+
+        from tkinter import scrolledtext
+        window = tk.Toplevel(self.root)
+        window.title("Profile Report")
+        window.geometry("900x600")
+        text_widget = scrolledtext.ScrolledText(window, font=("Consolas", 9), wrap=tk.NONE)
+        text_widget.pack(fill=tk.BOTH, expand=True)
+        text_widget.insert('1.0', text)
+        text_widget.config(state=tk.DISABLED)
+
+    def clear_tabs(self):
+        """Clear existing tabs from both notebooks"""
+        for tab in self.notebook.tabs():
+            self.notebook.forget(tab)
+        if self.csv_notebook is not None:
             for tab in self.csv_notebook.tabs():
                 self.csv_notebook.forget(tab)
+        self.pending_csv_tabs = {}
+
+    def process_zip_file(self, zip_path, skipped=()):
+        """Process the dropped/selected zip file"""
+        self.status_label.config(text=f"Processing: {os.path.basename(zip_path)}{self.skipped_note(skipped)}")
+        # Cancel first, so the previous job doesn't take the new profile with it
+        self.cancel_job()
+        self.begin_profile(os.path.basename(zip_path), [zip_path])
+        self.start_job(
+            lambda cancel_event, report: self.load_zip_file(zip_path, cancel_event, report),
+            lambda loaded: self.show_zip_file(zip_path, loaded, skipped)
+        )
 
-            self.status_label.config(text=f"Processing CSV file(s)...")
+    def load_zip_file(self, zip_path, cancel_event, report):
+        """Read, parse and generate templates for a zip (background thread)
+
+        An unchanged ZIP that was opened before is read back from the export
+        cache instead, skipping decompression, parsing and grouping.
+        """
+        with audit_profile.span('export cache lookup'):
+            cache_key = audit_cache.export_key(zip_path)
+            cached = self.export_cache.load(cache_key)
+            # Batch mode saves no members file, and the CSV tabs need the raw rows
+            results = self.export_cache.load_members(cache_key) if cached is not None else None
+        if results is None:
+            cached = None
+
+        if cached is not None:
+            report(f"Loaded {os.path.basename(zip_path)} from cache")
+        else:
+            report(f"Unzipping {os.path.basename(zip_path)}...")
 
-            # Store CSV data for template generation
-            csv_data = {}
+            # Get all CSV files in the zip
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                csv_files = audit_core.list_zip_csv_members(zip_ref)
 
-            for csv_path in csv_paths:
-                try:
-                    with open(csv_path, 'r', encoding='utf-8') as f:
-                        csv_reader = csv.reader(f)
-                        rows = list(csv_reader)
+            if not csv_files:
+                return None
 
-                        # Display the CSV
-                        self.display_csv_from_rows(rows, os.path.basename(csv_path))
-                        csv_data[os.path.basename(csv_path).lower()] = rows
+            # Read and parse the CSV files concurrently
+            report(f"Decoding and parsing {len(csv_files)} CSV file(s)...")
+            with audit_profile.span('read and parse CSVs'):
+                results = audit_core.read_zip_csvs(
+                    zip_path, csv_files, cancel_event=cancel_event,
+                    progress=lambda done, total, name: report(f"Parsed {done} of {total} CSV file(s): {os.path.basename(name)}")
+                )
 
-                except Exception as e:
-                    self.status_label.config(text=f"Error reading {os.path.basename(csv_path)}: {str(e)}")
+        # Store CSV data for template generation
+        csv_data = {}
+        search_indexes = {}
+        for csv_filename, result in results.items():
+            if isinstance(result, Exception):
+                csv_data[os.path.basename(csv_filename).lower()] = []
+                continue
+            rows = result[0]
+            with audit_profile.span('terminal dump'):
+                audit_log.dump_table(csv_filename, rows, self.dump_rows)
+            csv_data[os.path.basename(csv_filename).lower()] = rows
+            with audit_profile.span('search index'):
+                search_indexes[csv_filename] = self.build_search_index(rows)
+
+        # Generate templates if we have the required files; a cached export is already grouped
+        templates = self.generate_templates(
+            csv_data, cancel_event, report, audit_core.Session(),
+            rooftops=cached['rooftops'] if cached is not None else None
+        )
+        if cached is not None:
+            return results, search_indexes, templates
+
+        # Only cache complete exports; a member that failed to read may work next time
+        renderer = templates[0].renderer if templates is not None else None
+        if renderer is not None and not any(isinstance(result, Exception) for result in results.values()):
+            report("Saving parsed export to cache...")
+            with audit_profile.span('save to cache'):
+                self.export_cache.save(cache_key, {
+                    'rooftops': renderer.rooftops,
+                    'csm_rooftops': renderer.csm_rooftops,
+                    'encodings': {os.path.basename(name).lower(): encoding for name, (_, encoding) in results.items()},
+                }, members=results)
+        return results, search_indexes, templates
+
+    def show_zip_file(self, zip_path, loaded, skipped=()):
+        """Build the tabs for a loaded zip (Tk thread)"""
+        if loaded is None:
+            self.status_label.config(text=f"No CSV files found in ZIP archive{self.skipped_note(skipped)}")
+            self.end_profile()
+            return
+
+        results, search_indexes, templates = loaded
+        self.clear_tabs()
+        self.current_file_label.config(text=f"Current file: {os.path.basename(zip_path)}")
+
+        with audit_profile.span('raw CSV tables'):
+            for csv_filename, result in results.items():
+                self.add_csv_tab(
+                    os.path.basename(csv_filename),
+                    lambda csv_filename=csv_filename, result=result:
+                        self.display_csv(csv_filename, result, search_indexes.get(csv_filename))
+                )
+        with audit_profile.span('template tabs'):
+            self.show_templates(templates)
+        if templates is None:
+            self.session = audit_core.Session()
+
+        self.status_label.config(
+            text=f"✓ Loaded {len(results)} CSV file(s) from {os.path.basename(zip_path)}{self.skipped_note(skipped)}"
+        )
+        self.end_profile()
+
+    def process_csv_files(self, csv_paths, skipped=()):
+        """Process standalone CSV files (not in a ZIP)"""
+        self.status_label.config(text=f"Processing CSV file(s)...{self.skipped_note(skipped)}")
+        self.cancel_job()
+        self.begin_profile(f"{len(csv_paths)} CSV file(s)", csv_paths)
+        self.start_job(
+            lambda cancel_event, report: self.load_csv_files(csv_paths, cancel_event, report),
+            lambda loaded: self.show_csv_files(loaded, skipped)
+        )
+
+    def load_csv_files(self, csv_paths, cancel_event, report):
+        """Read, parse and generate templates for standalone CSVs (background thread)"""
+        # Read and parse the files concurrently
+        report(f"Decoding and parsing {len(csv_paths)} CSV file(s)...")
+        with audit_profile.span('read and parse CSVs'):
+            results = audit_core.read_csv_paths(
+                csv_paths, cancel_event=cancel_event,
+                progress=lambda done, total, path: report(f"Parsed {done} of {total} CSV file(s): {os.path.basename(path)}")
+            )
+
+        csv_data = {}
+        search_indexes = {}
+        for csv_path, result in results.items():
+            if isinstance(result, Exception):
+                continue
+            rows = result[0]
+            with audit_profile.span('terminal dump'):
+                audit_log.dump_table(csv_path, rows, self.dump_rows)
+            csv_data[os.path.basename(csv_path).lower()] = rows
+            with audit_profile.span('search index'):
+                search_indexes[csv_path] = self.build_search_index(rows)
+
+        # Add the files to the current session, regenerating only what they affect
+        templates = self.generate_templates(csv_data, cancel_event, report, self.session)
+        return results, search_indexes, templates
+
+    def show_csv_files(self, loaded, skipped=()):
+        """Add tabs for loaded standalone CSVs, replacing those of the same name (Tk thread)"""
+        results, search_indexes, templates = loaded
+
+        loaded_count = 0
+        with audit_profile.span('raw CSV tables'):
+            for csv_path, result in results.items():
+                if isinstance(result, Exception):
+                    self.status_label.config(text=f"Error reading {os.path.basename(csv_path)}: {str(result)}")
                     continue
+                rows, encoding = result
+                filename = os.path.basename(csv_path)
+                self.add_csv_tab(
+                    filename,
+                    lambda rows=rows, filename=filename, encoding=encoding, csv_path=csv_path:
+                        self.display_csv_from_rows(rows, filename, encoding, search_indexes.get(csv_path))
+                )
+                loaded_count += 1
 
-            # Generate templates if we have the required files
-            self.generate_templates(csv_data)
+        with audit_profile.span('template tabs'):
+            self.show_templates(templates)
 
-            self.status_label.config(text=f"✓ Loaded {len(csv_data)} CSV file(s)")
+        self.status_label.config(text=f"✓ Loaded {loaded_count} CSV file(s){self.skipped_note(skipped)}")
+        self.end_profile()
 
-        except Exception as e:
-            self.status_label.config(text=f"Error: {str(e)}")
+    def build_search_index(self, rows):
+        """Index a CSV's data rows for the raw data search box"""
+        if not rows:
+            return None
+        return audit_core.RowSearchIndex(rows[1:], len(rows[0]))
 
-    def display_csv_from_rows(self, rows, filename):
+    def display_csv_from_rows(self, rows, filename, encoding=None, search_index=None):
         """Display CSV rows in a new tab"""
         try:
-            # Print to terminal
-            self.print_csv_to_terminal(filename, rows)
-
             # Create a frame for this CSV in the CSV notebook (not main notebook)
             frame = ttk.Frame(self.csv_notebook)
             self.csv_notebook.add(frame, text=os.path.basename(filename))
@@ -387,84 +960,42 @@ class ZipCSVReaderApp:
             )
             search_count_label.pack(side=tk.RIGHT, padx=10)
 
-            # Create treeview for tabular display
-            tree_frame = ttk.Frame(frame)
-            tree_frame.pack(fill=tk.BOTH, expand=True)
-
-            # Add scrollbars
-            vsb = ttk.Scrollbar(tree_frame, orient="vertical")
-            hsb = ttk.Scrollbar(tree_frame, orient="horizontal")
-
-            tree = ttk.Treeview(
-                tree_frame,
-                yscrollcommand=vsb.set,
-                xscrollcommand=hsb.set
-            )
-
-            vsb.config(command=tree.yview)
-            hsb.config(command=tree.xview)
-
-            # Grid layout
-            tree.grid(row=0, column=0, sticky=(tk.N, tk.S, tk.E, tk.W))
-            vsb.grid(row=0, column=1, sticky=(tk.N, tk.S))
-            hsb.grid(row=1, column=0, sticky=(tk.E, tk.W))
-
-            tree_frame.columnconfigure(0, weight=1)
-            tree_frame.rowconfigure(0, weight=1)
-
-            # Store all items for search filtering
-            all_items = []
-
             if rows:
-                # Set up columns
+                # Set up a table that only creates items for the rows in view
                 headers = rows[0]
-                tree["columns"] = headers
-                tree["show"] = "headings"
-
-                # Configure columns
-                for header in headers:
-                    tree.heading(header, text=header)
-                    tree.column(header, width=150, minwidth=50)
-
-                # Add data rows
-                for row in rows[1:]:
-                    # Ensure row has same length as headers
-                    while len(row) < len(headers):
-                        row.append('')
-                    item_id = tree.insert("", tk.END, values=row[:len(headers)])
-                    all_items.append((item_id, row[:len(headers)]))
-
-                # Search functionality
-                def on_search(*args):
+                data_rows = rows[1:]
+                table = VirtualTable(frame, headers)
+                table.frame.pack(fill=tk.BOTH, expand=True)
+                table.set_rows(data_rows)
+
+                # Search functionality - index built once, search runs after typing pauses
+                index = search_index or self.build_search_index(rows)
+                pending_search = [None]
+
+                def run_search():
+                    pending_search[0] = None
                     search_term = search_var.get().lower().strip()
-                    visible_count = 0
-
-                    for item_id, values in all_items:
-                        # Check if search term is in any cell
-                        row_text = ' '.join(str(v).lower() for v in values)
-                        if search_term == '' or search_term in row_text:
-                            # Show item - reinsert if hidden
-                            try:
-                                tree.reattach(item_id, '', tk.END)
-                                visible_count += 1
-                            except:
-                                pass
-                        else:
-                            # Hide item
-                            tree.detach(item_id)
+                    match_idxs = index.search(search_term)
 
                     if search_term:
-                        search_count_label.config(text=f"{visible_count} of {len(all_items)} rows")
+                        table.set_rows([data_rows[idx] for idx in match_idxs])
+                        search_count_label.config(text=f"{len(match_idxs)} of {len(data_rows)} rows")
                     else:
-                        search_count_label.config(text=f"{len(all_items)} rows")
+                        table.set_rows(data_rows)
+                        search_count_label.config(text=f"{len(data_rows)} rows")
 
-                search_var.trace('w', on_search)
+                def on_search(*args):
+                    if pending_search[0] is not None:
+                        frame.after_cancel(pending_search[0])
+                    pending_search[0] = frame.after(SEARCH_DEBOUNCE_MS, run_search)
+
+                search_var.trace_add('write', on_search)
 
                 # Add info label
-                info_label = ttk.Label(
-                    frame,
-                    text=f"Rows: {len(rows)-1} | Columns: {len(headers)}"
-                )
+                info_text = f"Rows: {len(rows)-1} | Columns: {len(headers)}"
+                if encoding:
+                    info_text += f" | Encoding: {encoding}"
+                info_label = ttk.Label(frame, text=info_text)
                 info_label.pack(side=tk.BOTTOM, pady=5)
             else:
                 empty_label = ttk.Label(frame, text="CSV file is empty")
@@ -480,684 +1011,138 @@ class ZipCSVReaderApp:
             )
             error_label.pack(pady=20)
 
-    def display_csv(self, zip_ref, csv_filename):
-        """Display CSV file content in a new tab and return the rows"""
-        try:
-            # Read CSV content from zip
-            with zip_ref.open(csv_filename) as csv_file:
-                # Try different encodings
-                encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-                content = None
-
-                for encoding in encodings:
-                    try:
-                        csv_file.seek(0)
-                        content = csv_file.read().decode(encoding)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-
-                if content is None:
-                    raise ValueError(f"Could not decode {csv_filename} with any standard encoding")
-
-                # Parse CSV
-                csv_reader = csv.reader(io.StringIO(content))
-                rows = list(csv_reader)
-
-                # Print to terminal
-                self.print_csv_to_terminal(csv_filename, rows)
-
-                # Create a frame for this CSV in the CSV notebook (not main notebook)
-                frame = ttk.Frame(self.csv_notebook)
-                self.csv_notebook.add(frame, text=os.path.basename(csv_filename))
-
-                # Search bar frame
-                search_frame = tk.Frame(frame, bg="#f8f9fa")
-                search_frame.pack(fill=tk.X, padx=5, pady=5)
-
-                search_label = tk.Label(
-                    search_frame,
-                    text="Search:",
-                    font=("Segoe UI", 9),
-                    bg="#f8f9fa",
-                    fg=self.text_color
-                )
-                search_label.pack(side=tk.LEFT, padx=(5, 5))
-
-                search_var = tk.StringVar()
-                search_entry = tk.Entry(
-                    search_frame,
-                    textvariable=search_var,
-                    font=("Segoe UI", 10),
-                    relief=tk.FLAT,
-                    bg="white",
-                    fg=self.text_color,
-                    width=40
-                )
-                search_entry.pack(side=tk.LEFT, padx=5, ipady=4)
-
-                search_count_label = tk.Label(
-                    search_frame,
-                    text=f"{len(rows)-1} rows",
-                    font=("Segoe UI", 9),
-                    bg="#f8f9fa",
-                    fg="#7f8fa6"
-                )
-                search_count_label.pack(side=tk.RIGHT, padx=10)
+    def display_csv(self, csv_filename, result, search_index=None):
+        """Display a CSV read from a zip in a new tab and return the rows
 
-                # Create treeview for tabular display
-                tree_frame = ttk.Frame(frame)
-                tree_frame.pack(fill=tk.BOTH, expand=True)
-
-                # Add scrollbars
-                vsb = ttk.Scrollbar(tree_frame, orient="vertical")
-                hsb = ttk.Scrollbar(tree_frame, orient="horizontal")
-
-                tree = ttk.Treeview(
-                    tree_frame,
-                    yscrollcommand=vsb.set,
-                    xscrollcommand=hsb.set
-                )
-
-                vsb.config(command=tree.yview)
-                hsb.config(command=tree.xview)
-
-                # Grid layout
-                tree.grid(row=0, column=0, sticky=(tk.N, tk.S, tk.E, tk.W))
-                vsb.grid(row=0, column=1, sticky=(tk.N, tk.S))
-                hsb.grid(row=1, column=0, sticky=(tk.E, tk.W))
-
-                tree_frame.columnconfigure(0, weight=1)
-                tree_frame.rowconfigure(0, weight=1)
-
-                # Store all items for search filtering
-                all_items = []
-
-                if rows:
-                    # Set up columns
-                    headers = rows[0]
-                    tree["columns"] = headers
-                    tree["show"] = "headings"
-
-                    # Configure columns
-                    for header in headers:
-                        tree.heading(header, text=header)
-                        tree.column(header, width=150, minwidth=50)
-
-                    # Add data rows
-                    for row in rows[1:]:
-                        # Ensure row has same length as headers
-                        while len(row) < len(headers):
-                            row.append('')
-                        item_id = tree.insert("", tk.END, values=row[:len(headers)])
-                        all_items.append((item_id, row[:len(headers)]))
-
-                    # Search functionality
-                    def on_search(*args):
-                        search_term = search_var.get().lower().strip()
-                        visible_count = 0
-
-                        for item_id, values in all_items:
-                            # Check if search term is in any cell
-                            row_text = ' '.join(str(v).lower() for v in values)
-                            if search_term == '' or search_term in row_text:
-                                # Show item - reinsert if hidden
-                                try:
-                                    tree.reattach(item_id, '', tk.END)
-                                    visible_count += 1
-                                except:
-                                    pass
-                            else:
-                                # Hide item
-                                tree.detach(item_id)
-
-                        if search_term:
-                            search_count_label.config(text=f"{visible_count} of {len(all_items)} rows")
-                        else:
-                            search_count_label.config(text=f"{len(all_items)} rows")
-
-                    search_var.trace('w', on_search)
-
-                    # Add info label
-                    info_label = ttk.Label(
-                        frame,
-                        text=f"Rows: {len(rows)-1} | Columns: {len(headers)}"
-                    )
-                    info_label.pack(side=tk.BOTTOM, pady=5)
-                else:
-                    empty_label = ttk.Label(frame, text="CSV file is empty")
-                    empty_label.pack(pady=20)
-
-                return rows
-
-        except Exception as e:
+        result is the (rows, encoding) tuple, or the exception, from read_zip_csvs.
+        """
+        if isinstance(result, Exception):
             error_frame = ttk.Frame(self.csv_notebook)
             self.csv_notebook.add(error_frame, text=os.path.basename(csv_filename))
             error_label = ttk.Label(
                 error_frame,
-                text=f"Error reading file:\n{str(e)}",
+                text=f"Error reading file:\n{str(result)}",
                 foreground="red"
             )
             error_label.pack(pady=20)
             return []
 
-    def format_phone_number(self, phone):
-        """Format phone number as (111) 222-3333"""
-        # Remove all non-digit characters
-        digits = ''.join(filter(str.isdigit, str(phone)))
-
-        # Format based on length
-        if len(digits) == 10:
-            return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
-        elif len(digits) == 11 and digits[0] == '1':
-            # Handle numbers starting with 1
-            return f"({digits[1:4]}) {digits[4:7]}-{digits[7:]}"
-        else:
-            # Return original if format is unexpected
-            return phone
-
-    def capitalize_name(self, name):
-        """Capitalize name: each word's first character uppercase, rest lowercase"""
-        if not name:
-            return name
-        # Use title() to capitalize each word properly
-        return name.title()
-
-    def get_first_name(self, full_name):
-        """Extract first name from full name"""
-        if not full_name:
-            return full_name
-        # Split by space and take the first part
-        return full_name.strip().split()[0] if full_name.strip() else full_name
-
-    def generate_templates(self, csv_data):
-        """Generate email templates based on CSV data"""
-        # Check if we have the required files
-        lines_file = None
-        rooftop_file = None
-        desk_phones_file = None
-
-        for filename, rows in csv_data.items():
-            if 'lines_with_low' in filename and 'call_volume' in filename:
-                lines_file = rows
-            elif 'rooftop_information' in filename or 'rooftop_informatio' in filename:
-                rooftop_file = rows
-            elif 'desk_phones' in filename:
-                desk_phones_file = rows
-
-        if not lines_file or not rooftop_file:
-            print("\n" + "!"*80)
-            print("WARNING: Could not find required CSV files for template generation")
-            print(f"Available files: {list(csv_data.keys())}")
-            print("Required: 'rooftop_information.csv' and 'lines_with_low_*_call_volume.csv'")
-            print("!"*80 + "\n")
-            return
-
-        # Build desk phone lookup (display name -> phone number) if desk_phones file exists
-        desk_phone_lookup = {}
-        if desk_phones_file and len(desk_phones_file) > 1:
-            desk_headers = desk_phones_file[0]
-            desk_data = desk_phones_file[1:]
-
-            # Find column indices for desk phones file
-            desk_display_name_idx = None
-            desk_phone_number_idx = None
-
-            for idx, header in enumerate(desk_headers):
-                header_lower = header.lower().strip()
-                # Check for display name column
-                if 'display name' in header_lower or 'display_name' in header_lower:
-                    desk_display_name_idx = idx
-                # Check for phone number column - handle various naming conventions
-                if 'phone number' in header_lower or 'phone_number' in header_lower or 'phone numbers' in header_lower:
-                    desk_phone_number_idx = idx
-
-            if desk_display_name_idx is not None and desk_phone_number_idx is not None:
-                for row in desk_data:
-                    if len(row) > max(desk_display_name_idx, desk_phone_number_idx):
-                        display_name = row[desk_display_name_idx].strip().lower()
-                        phone_number = row[desk_phone_number_idx].strip()
-                        if display_name and phone_number:
-                            desk_phone_lookup[display_name] = phone_number
+        rows, encoding = result
+        self.display_csv_from_rows(rows, csv_filename, encoding, search_index)
+        return rows
+
+    def generate_templates(self, csv_data, cancel_event=None, report=None, session=None, rooftops=None):
+        """Generate email templates based on CSV data
+
+        The files are loaded on top of session (a fresh session by default),
+        so only the templates they affect are regenerated; rooftops may carry
+        an already grouped lines file. Does not touch Tk, so it can run on the
+        background thread. Returns (new session, changed template sets) for
+        show_templates, or None if generation failed. Raises TemplateError
+        if the template file has been edited into an unusable state.
+        """
+        if report is None:
+            report = lambda text: None
+        if session is None:
+            session = audit_core.Session()
 
         try:
-            # Parse lines_with_low_call_volume.csv
-            lines_headers = lines_file[0]
-            lines_data = lines_file[1:]
-
-            # Find column indices (case-insensitive)
-            def find_col_idx(headers, possible_names):
-                for name in possible_names:
-                    for idx, header in enumerate(headers):
-                        if name.lower() in header.lower():
-                            return idx
-                return None
-
-            # Find column indices with exact matching for "Name" to avoid confusion with "Display Name"
-            def find_exact_col_idx(headers, target_name):
-                """Find column index with exact name match (case-insensitive)"""
-                for idx, header in enumerate(headers):
-                    if header.strip().lower() == target_name.lower():
-                        return idx
-                return None
-
-            display_name_idx = find_col_idx(lines_headers, ['display name', 'display_name'])
-            phone_number_idx = find_col_idx(lines_headers, ['phone number', 'phone_number', 'number'])
-            rooftop_name_idx = find_col_idx(lines_headers, ['rooftop name', 'rooftop_name', 'rooftop'])
-            inbox_name_idx = find_col_idx(lines_headers, ['inbox name', 'inbox_name', 'inbox'])
-            owner_type_idx = find_col_idx(lines_headers, ['owner type', 'owner_type', 'ownertype'])
-            # Use exact match for "Name" to avoid matching "Display Name"
-            name_idx = find_exact_col_idx(lines_headers, 'name')
-
-            if None in [display_name_idx, phone_number_idx, rooftop_name_idx, inbox_name_idx]:
-                print("\nERROR: Could not find all required columns in lines_with_low_call_volume.csv")
-                print(f"Found headers: {lines_headers}")
-                return
-
-            # Group data by rooftop
-            rooftops = defaultdict(lambda: {'inbox_name': '', 'lines': []})
-
-            for row in lines_data:
-                # Find the maximum index we need to check
-                max_idx = max(display_name_idx, phone_number_idx, rooftop_name_idx, inbox_name_idx)
-                if owner_type_idx is not None:
-                    max_idx = max(max_idx, owner_type_idx)
-                if name_idx is not None:
-                    max_idx = max(max_idx, name_idx)
-
-                if len(row) > max_idx:
-                    rooftop = row[rooftop_name_idx].strip()
-                    if rooftop:  # Skip empty rooftops
-                        rooftops[rooftop]['inbox_name'] = row[inbox_name_idx].strip()
-
-                        # Get display name with fallback logic
-                        display_name = row[display_name_idx].strip() if display_name_idx < len(row) else ''
-
-                        # If display name is empty/null, check owner type
-                        if not display_name:
-                            owner_type = row[owner_type_idx].strip().upper() if owner_type_idx is not None and owner_type_idx < len(row) else ''
-                            name_value = row[name_idx].strip() if name_idx is not None and name_idx < len(row) else ''
-
-                            if owner_type == 'USER':
-                                display_name = f"Unassigned line - [{self.capitalize_name(name_value)}]"
-                            elif owner_type == 'DEPARTMENT':
-                                display_name = f"Unassigned line - [{self.capitalize_name(name_value)}]"
-                            else:
-                                display_name = self.capitalize_name(name_value) if name_value else 'Unknown'
-                        else:
-                            # Capitalize the display name
-                            display_name = self.capitalize_name(display_name)
-
-                        # Get raw name value for desk phone table
-                        raw_name = row[name_idx].strip() if name_idx is not None and name_idx < len(row) else ''
-                        raw_display_name = row[display_name_idx].strip() if display_name_idx < len(row) else ''
-
-                        # Look up desk phone number by matching display name (case-insensitive)
-                        desk_phone = desk_phone_lookup.get(raw_display_name.lower(), '')
-
-                        rooftops[rooftop]['lines'].append({
-                            'display_name': display_name,
-                            'phone_number': self.format_phone_number(row[phone_number_idx].strip()),
-                            'raw_display_name': raw_display_name,
-                            'raw_name': raw_name,
-                            'desk_phone': desk_phone
-                        })
-
-            # Generate templates
-            print("\n" + "="*80)
-            print("GENERATED EMAIL TEMPLATES")
-            print("="*80 + "\n")
-
-            template_text = ""
-            for rooftop_name, data in rooftops.items():
-                inbox_name = data['inbox_name']
-                lines = data['lines']
-
-                # Separate lines into regular users and department/unassigned lines
-                regular_lines = []
-                department_unassigned_lines = []
-
-                for line in lines:
-                    display_name = line['display_name']
-                    if display_name.startswith('Unassigned line'):
-                        department_unassigned_lines.append(line)
-                    else:
-                        regular_lines.append(line)
-
-                template = f"""Good morning [Dealership POC],
-
-We've recently noticed a drop in call volume on your account ({rooftop_name} – {inbox_name})
-
-To ensure you're getting the most out of your Numa subscription, please confirm that missed calls on the following users' direct lines are forwarding to their respective Numa IT forwarding lines after 4 rings (approximately 20 seconds), rather than going to local voicemail (including DND, busy, and after-hours scenarios):
-"""
-                # Add regular lines first
-                for line in regular_lines:
-                    template += f"• {line['display_name']} – Numa IT forwarding number: {line['phone_number']}\n"
-
-                # Add department/unassigned lines at the bottom
-                for line in department_unassigned_lines:
-                    template += f"• {line['display_name']} – Numa IT forwarding number: {line['phone_number']}\n"
-
-                template += """If you have any questions, feel free to email us at support@numa.com.
-"""
-
-                template_text += template + "\n" + "="*80 + "\n"
-                print(template)
-                print("="*80 + "\n")
-
-            # Generate CSM templates first
-            self.generate_csm_templates(rooftop_file, rooftops)
-
-            # Create a tab with dealership templates
-            self.create_template_tab(template_text, rooftops, "Dealership Templates")
-
+            report("Generating templates...")
+            with audit_profile.span('generate templates'):
+                session, changed = session.update(csv_data, rooftops, cancel_event)
+            audit_core.check_cancelled(cancel_event)
+
+            renderer = session.renderer
+            if renderer is None:
+                if not session.has_required_files():
+                    audit_core.report_missing_files(session.filenames.values())
+                return session, changed
+
+            with audit_profile.span('template log'):
+                if 'dealership' in changed:
+                    report(f"Rendering {len(renderer.rooftops)} template(s)...")
+                    audit_log.log_dealership_templates(renderer)
+                if 'csm' in changed and renderer.csm_rooftops is not None:
+                    audit_log.log_csm_templates(renderer)
+
+            return session, changed
+
+        except (audit_core.Cancelled, audit_core.TemplateError):
+            # A bad template file edit is shown in the status bar by start_job
+            raise
         except Exception as e:
             print(f"\nERROR generating templates: {str(e)}")
             import traceback
             traceback.print_exc()
+            return None
 
-    def generate_csm_templates(self, rooftop_file, rooftops):
-        """Generate CSM templates grouped by CSM Owner"""
-        try:
-            # Parse rooftop_information.csv
-            rooftop_headers = rooftop_file[0]
-            rooftop_data = rooftop_file[1:]
-
-            # Find column indices (case-insensitive)
-            def find_col_idx(headers, possible_names):
-                for name in possible_names:
-                    for idx, header in enumerate(headers):
-                        if name.lower() in header.lower():
-                            return idx
-                return None
-
-            rooftop_name_col_idx = find_col_idx(rooftop_headers, ['rooftop name', 'rooftop_name', 'rooftop'])
-            csm_owner_idx = find_col_idx(rooftop_headers, ['csm owner', 'csm_owner', 'csmowner'])
-
-            if rooftop_name_col_idx is None or csm_owner_idx is None:
-                print("\nWARNING: Could not find CSM Owner or Rooftop Name in rooftop_information.csv")
-                print(f"Found headers: {rooftop_headers}")
-                return
-
-            # Build a mapping of rooftop name to CSM owner and track all rooftops per CSM
-            rooftop_to_csm = {}
-            all_rooftops_by_csm = defaultdict(list)  # Track all rooftops per CSM from rooftop_information.csv
-            for row in rooftop_data:
-                if len(row) > max(rooftop_name_col_idx, csm_owner_idx):
-                    rooftop_name = row[rooftop_name_col_idx].strip()
-                    csm_owner = row[csm_owner_idx].strip()
-                    if rooftop_name and csm_owner:
-                        rooftop_to_csm[rooftop_name] = csm_owner
-                        all_rooftops_by_csm[csm_owner].append(rooftop_name)
-
-            # Group rooftops by CSM - only rooftops that have lines data
-            csm_rooftops = defaultdict(lambda: {'included': [], 'skipped': []})
-            for rooftop_name, data in rooftops.items():
-                csm_owner = rooftop_to_csm.get(rooftop_name, 'Unknown CSM')
-                inbox_name = data['inbox_name']
-                csm_rooftops[csm_owner]['included'].append({
-                    'rooftop_name': rooftop_name,
-                    'inbox_name': inbox_name
-                })
-
-            # Find skipped rooftops for each CSM (in rooftop_information but not in lines file)
-            for csm_owner, rooftop_names in all_rooftops_by_csm.items():
-                if csm_owner not in csm_rooftops:
-                    csm_rooftops[csm_owner] = {'included': [], 'skipped': []}
-                for rooftop_name in rooftop_names:
-                    if rooftop_name not in rooftops:
-                        csm_rooftops[csm_owner]['skipped'].append(rooftop_name)
-
-            # Generate CSM templates
-            print("\n" + "="*80)
-            print("GENERATED CSM TEMPLATES")
-            print("="*80 + "\n")
-
-            csm_template_text = ""
-            for csm_owner, data in csm_rooftops.items():
-                rooftop_list = data['included']
-                skipped_list = data['skipped']
-
-                # Skip CSMs that have no included rooftops
-                if len(rooftop_list) == 0:
-                    continue
-
-                template = f"Hi {self.get_first_name(csm_owner)},\n\n"
-                template += "We've identified the following dealerships with low call volume over the past two weeks. To help us follow up, could you please provide a point of contact for each location so we can reach out to them?\n"
-
-                for rooftop_info in rooftop_list:
-                    template += f"• {rooftop_info['rooftop_name']} – {rooftop_info['inbox_name']}\n"
-
-                template += "\n"
-
-                csm_template_text += template + "\n" + "="*80 + "\n"
-                print(template)
-                if skipped_list:
-                    print(f"  [Skipped {len(skipped_list)} rooftop(s) - not in lines file: {', '.join(skipped_list)}]")
-                print("="*80 + "\n")
-
-            # Create a tab with CSM templates
-            self.create_csm_template_tab(csm_template_text, csm_rooftops)
-
-        except Exception as e:
-            print(f"\nERROR generating CSM templates: {str(e)}")
-            import traceback
-            traceback.print_exc()
+    def show_templates(self, templates):
+        """Create or replace the template tabs that changed (Tk thread)"""
+        if templates is None:
+            return
 
-    def create_template_tab(self, template_text, rooftops, tab_name="Dealership Templates"):
+        session, changed = templates
+        self.session = session
+        renderer = session.renderer
+
+        # CSM tab first, then dealership templates
+        if 'csm' in changed:
+            create = None
+            if renderer is not None and renderer.csm_rooftops is not None:
+                create = lambda: self.create_csm_template_tab(renderer)
+            self.replace_tab(self.notebook, "CSM Templates", create, index=0)
+        if 'dealership' in changed:
+            create = None
+            if renderer is not None:
+                create = lambda: self.create_template_tab(renderer, "Dealership Templates")
+            self.replace_tab(self.notebook, "Dealership Templates", create)
+
+    def replace_tab(self, notebook, tab_text, create=None, index=tk.END):
+        """Swap the tab titled tab_text for the one create() adds, keeping its place
+
+        With no create the old tab is just removed. A tab that didn't exist
+        before is placed at index.
+        """
+        for position, tab in enumerate(notebook.tabs()):
+            if notebook.tab(tab, 'text') == tab_text:
+                index = position
+                notebook.forget(tab)
+                break
+
+        if create is not None:
+            create()
+            notebook.insert(index, notebook.tabs()[-1])
+
+    def create_template_tab(self, renderer, tab_name="Dealership Templates"):
         """Create a new tab to display generated templates"""
+        rooftops = renderer.rooftops
         frame = tk.Frame(self.notebook, bg=self.bg_color)
         self.notebook.add(frame, text=tab_name)
 
-        # Add a canvas with scrollbar for multiple template cards
-        canvas = tk.Canvas(frame, bg=self.bg_color, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg=self.bg_color)
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        # Template text is kept as plain data per rooftop; card widgets are only
+        # built for the cards in view and are reused as the list scrolls
+        cards = [
+            {
+                'number': idx,
+                'rooftop_name': rooftop_name,
+                'data': data,
+                'subject': renderer.subject_line(rooftop_name),
+                'text': None
+            }
+            for idx, (rooftop_name, data) in enumerate(rooftops.items(), 1)
+        ]
+
+        card_list = LazyCardList(
+            frame,
+            len(cards),
+            self.make_dealership_card,
+            lambda card, index: self.bind_dealership_card(card, cards[index], renderer),
+            lambda card, index: self.save_dealership_card(card, cards[index]),
+            self.bg_color
         )
 
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Create individual template cards for each rooftop
-        for idx, (rooftop_name, data) in enumerate(rooftops.items(), 1):
-            inbox_name = data['inbox_name']
-            lines = data['lines']
-
-            # Separate lines into regular users and department/unassigned lines
-            regular_lines = []
-            department_unassigned_lines = []
-
-            for line in lines:
-                display_name = line['display_name']
-                if display_name.startswith('Unassigned line'):
-                    department_unassigned_lines.append(line)
-                else:
-                    regular_lines.append(line)
-
-            # Generate clean template for this rooftop
-            template = f"Good morning [Dealership POC],\n\n"
-            template += f"We've recently noticed a drop in call volume on your account ({rooftop_name} – {inbox_name})\n\n"
-            template += "To ensure you're getting the most out of your Numa subscription, please confirm that missed calls on the following users' direct lines are forwarding to their respective Numa IT forwarding lines after 4 rings (approximately 20 seconds), rather than going to local voicemail (including DND, busy, and after-hours scenarios):\n"
-
-            # Add regular lines first
-            for line in regular_lines:
-                template += f"• {line['display_name']} – Numa IT forwarding number: {line['phone_number']}\n"
-
-            # Add department/unassigned lines at the bottom
-            for line in department_unassigned_lines:
-                template += f"• {line['display_name']} – Numa IT forwarding number: {line['phone_number']}\n"
-
-            template += "\nAdditionally, when you have a moment, kindly update the following roster with the latest desk phone numbers for your staff members\nRoster link [insert roster link here]\n"
-            template += "\nIf you have any questions, feel free to email us at support@numa.com."
-
-            # Create card frame with modern styling
-            card_frame = tk.Frame(
-                scrollable_frame,
-                bg="white",
-                highlightbackground="#dfe4ea",
-                highlightthickness=1,
-                relief=tk.FLAT
-            )
-            card_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
-
-            # Card header
-            header_frame = tk.Frame(card_frame, bg="white")
-            header_frame.pack(fill=tk.X, padx=15, pady=(15, 10))
-
-            header_label = tk.Label(
-                header_frame,
-                text=f"Template {idx}: {rooftop_name}",
-                font=("Segoe UI", 11, "bold"),
-                bg="white",
-                fg=self.accent_color,
-                anchor=tk.W
-            )
-            header_label.pack(side=tk.LEFT)
-
-            # Subject line display
-            subject_line = f"{rooftop_name} - {inbox_name}: Phoneline forwarding"
-
-            subject_frame = tk.Frame(card_frame, bg="white")
-            subject_frame.pack(fill=tk.X, padx=15, pady=(0, 5))
-
-            subject_label = tk.Label(
-                subject_frame,
-                text="Subject: ",
-                font=("Segoe UI", 10, "bold"),
-                bg="white",
-                fg=self.text_color
-            )
-            subject_label.pack(side=tk.LEFT)
-
-            subject_text = tk.Entry(
-                subject_frame,
-                font=("Segoe UI", 10),
-                relief=tk.FLAT,
-                bg="#f8f9fa",
-                fg=self.text_color,
-                width=60
-            )
-            subject_text.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
-            subject_text.insert(0, subject_line)
-
-            # Content frame - side by side layout for template and desk phones table
-            content_frame = tk.Frame(card_frame, bg="white")
-            content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 10))
-
-            # Left side - Template text widget (editable)
-            left_frame = tk.Frame(content_frame, bg="white")
-            left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-            text_widget = tk.Text(
-                left_frame,
-                wrap=tk.WORD,
-                height=14,
-                font=("Segoe UI", 10),
-                relief=tk.FLAT,
-                borderwidth=0,
-                padx=12,
-                pady=8,
-                bg="#f8f9fa",
-                fg=self.text_color
-            )
-            text_widget.pack(fill=tk.BOTH, expand=True)
-            text_widget.insert(1.0, template)
-            # Template is now editable - no state=DISABLED
-
-            # Right side - Possible desk phones table
-            right_frame = tk.Frame(content_frame, bg="white")
-            right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(15, 0))
-
-            desk_phones_label = tk.Label(
-                right_frame,
-                text="Possible Desk Phones",
-                font=("Segoe UI", 10, "bold"),
-                bg="white",
-                fg=self.accent_color
-            )
-            desk_phones_label.pack(anchor=tk.W, pady=(0, 5))
-
-            # Create treeview for desk phones table
-            desk_tree_frame = tk.Frame(right_frame, bg="white")
-            desk_tree_frame.pack(fill=tk.BOTH, expand=True)
-
-            desk_tree = ttk.Treeview(
-                desk_tree_frame,
-                columns=("display_name", "name"),
-                show="headings",
-                height=10
-            )
-            desk_tree.heading("display_name", text="Display Name")
-            desk_tree.heading("name", text="Name")
-            desk_tree.column("display_name", width=150, minwidth=100)
-            desk_tree.column("name", width=250, minwidth=180)
-
-            # Add scrollbar for desk phones table
-            desk_scrollbar = ttk.Scrollbar(desk_tree_frame, orient="vertical", command=desk_tree.yview)
-            desk_tree.configure(yscrollcommand=desk_scrollbar.set)
-
-            desk_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            desk_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-            # Populate desk phones table with all lines (regular + unassigned)
-            for line in regular_lines + department_unassigned_lines:
-                raw_display = line.get('raw_display_name', '')
-                raw_name = line.get('raw_name', '')
-                desk_tree.insert("", tk.END, values=(raw_display, raw_name))
-
-            # Button frame
-            button_frame = tk.Frame(card_frame, bg="white")
-            button_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
-
-            # Copy button for this template - reads from text widget
-            def make_copy_func(tw, subj_entry, btn, orig_text, rname):
-                def copy_func():
-                    current_text = tw.get("1.0", tk.END).strip()
-                    current_subject = subj_entry.get().strip()
-                    full_copy = f"Subject: {current_subject}\n\n{current_text}"
-                    self.root.clipboard_clear()
-                    self.root.clipboard_append(full_copy)
-                    self.status_label.config(text=f"✓ Copied template for {rname} to clipboard", bg=self.success_color, fg="white")
-                    btn.config(text="✓ Copied!", bg=self.success_color)
-                    # Reset button text after 2 seconds
-                    self.root.after(2000, lambda: (btn.config(text=orig_text, bg=self.primary_color),
-                                                   self.status_label.config(bg="#ecf0f1", fg=self.text_color)))
-                return copy_func
-
-            button_text = f"📋 Copy Template {idx}"
-            copy_btn = tk.Button(
-                button_frame,
-                text=button_text,
-                font=("Segoe UI", 9, "bold"),
-                bg=self.primary_color,
-                fg="white",
-                activebackground=self.secondary_color,
-                activeforeground="white",
-                relief=tk.FLAT,
-                borderwidth=0,
-                padx=15,
-                pady=8,
-                cursor="hand2"
-            )
-            copy_btn.config(command=make_copy_func(text_widget, subject_text, copy_btn, button_text, rooftop_name))
-            copy_btn.pack(side=tk.LEFT, padx=(0, 5))
-
-            # Info label
-            info_label = tk.Label(
-                button_frame,
-                text=f"{len(lines)} phone line(s)",
-                font=("Segoe UI", 9),
-                bg="white",
-                fg="#7f8fa6"
-            )
-            info_label.pack(side=tk.RIGHT, padx=5)
-
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        card_list.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        card_list.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Add summary at bottom
         summary_frame = tk.Frame(frame, bg=self.bg_color)
@@ -1175,7 +1160,7 @@ To ensure you're getting the most out of your Numa subscription, please confirm
         # Copy all button
         def copy_all():
             self.root.clipboard_clear()
-            self.root.clipboard_append(template_text)
+            self.root.clipboard_append(renderer.all_dealership_text())
             self.status_label.config(text=f"✓ Copied all {len(rooftops)} template(s) to clipboard", bg=self.success_color, fg="white")
             copy_all_btn.config(text="✓ Copied!", bg=self.success_color)
             # Reset button text after 2 seconds
@@ -1199,8 +1184,246 @@ To ensure you're getting the most out of your Numa subscription, please confirm
         )
         copy_all_btn.pack(side=tk.RIGHT)
 
-    def create_csm_template_tab(self, template_text, csm_rooftops):
+        # Export button: edited cards are exported as shown, the rest are rendered
+        # one at a time without filling the renderer's cache
+        def export_all():
+            card_list.save_bound()
+            snapshot = [(model['number'], model['rooftop_name'], model['subject'], model['text']) for model in cards]
+            emails = ((f"{number:04d} {rooftop_name}", subject,
+                       text if text is not None else renderer.dealership(rooftop_name, cache=False))
+                      for number, rooftop_name, subject, text in snapshot)
+            self.export_emails(emails, "dealership template(s)")
+
+        tk.Button(
+            summary_frame,
+            text="✉ Export Emails",
+            command=export_all,
+            font=("Segoe UI", 9, "bold"),
+            bg=self.secondary_color,
+            fg="white",
+            activebackground=self.accent_color,
+            activeforeground="white",
+            relief=tk.FLAT,
+            borderwidth=0,
+            padx=20,
+            pady=10,
+            cursor="hand2"
+        ).pack(side=tk.RIGHT, padx=(0, 10))
+
+        tk.Button(
+            summary_frame,
+            text="🗂 Export Data",
+            command=lambda: self.export_data(renderer),
+            font=("Segoe UI", 9, "bold"),
+            bg=self.secondary_color,
+            fg="white",
+            activebackground=self.accent_color,
+            activeforeground="white",
+            relief=tk.FLAT,
+            borderwidth=0,
+            padx=20,
+            pady=10,
+            cursor="hand2"
+        ).pack(side=tk.RIGHT, padx=(0, 10))
+
+    def make_dealership_card(self, parent):
+        """Build an empty dealership template card for LazyCardList"""
+        card = {'model': None}
+
+        # Create card frame with modern styling
+        card_frame = tk.Frame(
+            parent,
+            bg="white",
+            highlightbackground="#dfe4ea",
+            highlightthickness=1,
+            relief=tk.FLAT
+        )
+        card['frame'] = card_frame
+
+        # Card header
+        header_frame = tk.Frame(card_frame, bg="white")
+        header_frame.pack(fill=tk.X, padx=15, pady=(15, 10))
+
+        card['header_label'] = tk.Label(
+            header_frame,
+            text="",
+            font=("Segoe UI", 11, "bold"),
+            bg="white",
+            fg=self.accent_color,
+            anchor=tk.W
+        )
+        card['header_label'].pack(side=tk.LEFT)
+
+        # Subject line display
+        subject_frame = tk.Frame(card_frame, bg="white")
+        subject_frame.pack(fill=tk.X, padx=15, pady=(0, 5))
+
+        subject_label = tk.Label(
+            subject_frame,
+            text="Subject: ",
+            font=("Segoe UI", 10, "bold"),
+            bg="white",
+            fg=self.text_color
+        )
+        subject_label.pack(side=tk.LEFT)
+
+        card['subject_text'] = tk.Entry(
+            subject_frame,
+            font=("Segoe UI", 10),
+            relief=tk.FLAT,
+            bg="#f8f9fa",
+            fg=self.text_color,
+            width=60
+        )
+        card['subject_text'].pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
+
+        # Content frame - side by side layout for template and desk phones table
+        content_frame = tk.Frame(card_frame, bg="white")
+        content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 10))
+
+        # Left side - Template text widget (editable)
+        left_frame = tk.Frame(content_frame, bg="white")
+        left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        card['text_widget'] = tk.Text(
+            left_frame,
+            wrap=tk.WORD,
+            height=14,
+            font=("Segoe UI", 10),
+            relief=tk.FLAT,
+            borderwidth=0,
+            padx=12,
+            pady=8,
+            bg="#f8f9fa",
+            fg=self.text_color
+        )
+        card['text_widget'].pack(fill=tk.BOTH, expand=True)
+        # Template is editable - no state=DISABLED
+
+        # Right side - Possible desk phones table
+        right_frame = tk.Frame(content_frame, bg="white")
+        right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(15, 0))
+
+        desk_phones_label = tk.Label(
+            right_frame,
+            text="Possible Desk Phones",
+            font=("Segoe UI", 10, "bold"),
+            bg="white",
+            fg=self.accent_color
+        )
+        desk_phones_label.pack(anchor=tk.W, pady=(0, 5))
+
+        # Create treeview for desk phones table
+        desk_tree_frame = tk.Frame(right_frame, bg="white")
+        desk_tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        desk_tree = ttk.Treeview(
+            desk_tree_frame,
+            columns=("display_name", "name"),
+            show="headings",
+            height=10
+        )
+        desk_tree.heading("display_name", text="Display Name")
+        desk_tree.heading("name", text="Name")
+        desk_tree.column("display_name", width=150, minwidth=100)
+        desk_tree.column("name", width=250, minwidth=180)
+        card['desk_tree'] = desk_tree
+
+        # Add scrollbar for desk phones table
+        desk_scrollbar = ttk.Scrollbar(desk_tree_frame, orient="vertical", command=desk_tree.yview)
+        desk_tree.configure(yscrollcommand=desk_scrollbar.set)
+
+        desk_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        desk_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Button frame
+        button_frame = tk.Frame(card_frame, bg="white")
+        button_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
+
+        # Copy button for this template - reads from text widget
+        copy_btn = tk.Button(
+            button_frame,
+            text="",
+            font=("Segoe UI", 9, "bold"),
+            bg=self.primary_color,
+            fg="white",
+            activebackground=self.secondary_color,
+            activeforeground="white",
+            relief=tk.FLAT,
+            borderwidth=0,
+            padx=15,
+            pady=8,
+            cursor="hand2"
+        )
+        copy_btn.config(command=lambda: self.copy_dealership_card(card))
+        copy_btn.pack(side=tk.LEFT, padx=(0, 5))
+        card['copy_btn'] = copy_btn
+
+        # Info label
+        card['info_label'] = tk.Label(
+            button_frame,
+            text="",
+            font=("Segoe UI", 9),
+            bg="white",
+            fg="#7f8fa6"
+        )
+        card['info_label'].pack(side=tk.RIGHT, padx=5)
+
+        return card
+
+    def bind_dealership_card(self, card, model, renderer):
+        """Fill a pooled card with one rooftop's template"""
+        card['model'] = model
+        rooftop_name = model['rooftop_name']
+        lines = model['data']['lines']
+
+        # Use the cached template until the card has been edited
+        if model['text'] is None:
+            model['text'] = renderer.dealership(rooftop_name)
+
+        card['header_label'].config(text=f"Template {model['number']}: {rooftop_name}")
+
+        card['subject_text'].delete(0, tk.END)
+        card['subject_text'].insert(0, model['subject'])
+
+        card['text_widget'].delete("1.0", tk.END)
+        card['text_widget'].insert("1.0", model['text'])
+
+        # Populate desk phones table with all lines (regular + unassigned)
+        desk_tree = card['desk_tree']
+        desk_tree.delete(*desk_tree.get_children())
+        regular_lines, department_unassigned_lines = audit_core.split_lines(lines)
+        for line in regular_lines + department_unassigned_lines:
+            desk_tree.insert("", tk.END, values=(line.raw_display_name, line.raw_name))
+
+        card['copy_btn'].config(text=f"📋 Copy Template {model['number']}", bg=self.primary_color)
+        card['info_label'].config(text=f"{len(lines)} phone line(s)")
+
+    def save_dealership_card(self, card, model):
+        """Keep edits made in a card before it is reused for another rooftop"""
+        model['subject'] = card['subject_text'].get()
+        model['text'] = card['text_widget'].get("1.0", "end-1c")
+
+    def copy_dealership_card(self, card):
+        """Copy the subject and template shown in a card to the clipboard"""
+        model = card['model']
+        current_text = card['text_widget'].get("1.0", tk.END).strip()
+        current_subject = card['subject_text'].get().strip()
+        full_copy = f"Subject: {current_subject}\n\n{current_text}"
+        self.root.clipboard_clear()
+        self.root.clipboard_append(full_copy)
+        self.status_label.config(text=f"✓ Copied template for {model['rooftop_name']} to clipboard", bg=self.success_color, fg="white")
+        card['copy_btn'].config(text="✓ Copied!", bg=self.success_color)
+
+        # Reset button text after 2 seconds (the card may show another rooftop by then)
+        def reset():
+            card['copy_btn'].config(text=f"📋 Copy Template {card['model']['number']}", bg=self.primary_color)
+            self.status_label.config(bg="#ecf0f1", fg=self.text_color)
+        self.root.after(2000, reset)
+
+    def create_csm_template_tab(self, renderer):
         """Create a new tab to display CSM templates"""
+        csm_rooftops = renderer.csm_rooftops
         frame = tk.Frame(self.notebook, bg=self.bg_color)
         self.notebook.add(frame, text="CSM Templates")
 
@@ -1217,8 +1440,10 @@ To ensure you're getting the most out of your Numa subscription, please confirm
         canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
         canvas.configure(yscrollcommand=scrollbar.set)
 
-        # Create individual template cards for each CSM
+        # Create individual template cards for each CSM, keeping each text
+        # widget so Export Emails sends what the user edited
         template_count = 0
+        card_texts = []
         for csm_owner, data in csm_rooftops.items():
             rooftop_list = data['included']
             skipped_list = data['skipped']
@@ -1230,14 +1455,8 @@ To ensure you're getting the most out of your Numa subscription, please confirm
             template_count += 1
             idx = template_count
 
-            # Generate clean template for this CSM
-            template = f"Hi {self.get_first_name(csm_owner)},\n\n"
-            template += "We've identified the following dealerships with low call volume over the past two weeks. To help us follow up, could you please provide a point of contact for each location so we can reach out directly?\n"
-
-            for rooftop_info in rooftop_list:
-                template += f"• {rooftop_info['rooftop_name']} – {rooftop_info['inbox_name']}\n"
-
-            template += "\nPlease let us know whether the lines are intentionally not forwarding, or if you'd prefer that we avoid contacting any of the dealerships mentioned above."
+            # Cached template for this CSM
+            template = renderer.csm(csm_owner)
 
             # Create card frame with modern styling
             card_frame = tk.Frame(
@@ -1279,6 +1498,7 @@ To ensure you're getting the most out of your Numa subscription, please confirm
             text_widget.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 10))
             text_widget.insert(1.0, template)
             # Template is now editable - no state=DISABLED
+            card_texts.append((csm_owner, text_widget))
 
             # Skipped rooftops note (if any)
             if skipped_list:
@@ -1404,7 +1624,7 @@ To ensure you're getting the most out of your Numa subscription, please confirm
         # Copy all button
         def copy_all():
             self.root.clipboard_clear()
-            self.root.clipboard_append(template_text)
+            self.root.clipboard_append(renderer.all_csm_text())
             self.status_label.config(text=f"✓ Copied all {template_count} CSM template(s) to clipboard", bg=self.success_color, fg="white")
             copy_all_btn.config(text="✓ Copied!", bg=self.success_color)
             # Reset button text after 2 seconds
@@ -1428,47 +1648,90 @@ To ensure you're getting the most out of your Numa subscription, please confirm
         )
         copy_all_btn.pack(side=tk.RIGHT)
 
-    def print_csv_to_terminal(self, filename, rows):
-        """Print CSV content to terminal in a formatted table"""
-        print("\n" + "="*80)
-        print(f"CSV FILE: {os.path.basename(filename)}")
-        print("="*80)
+        # Export button: each card's text is read here, on the Tk thread, as edited
+        def export_all():
+            emails = [(f"CSM {number:04d} {csm_owner}", renderer.csm_subject_line(csm_owner),
+                       text_widget.get("1.0", "end-1c"))
+                      for number, (csm_owner, text_widget) in enumerate(card_texts, 1)]
+            self.export_emails(emails, "CSM template(s)")
 
-        if not rows:
-            print("(Empty file)")
+        tk.Button(
+            summary_frame,
+            text="✉ Export Emails",
+            command=export_all,
+            font=("Segoe UI", 9, "bold"),
+            bg=self.secondary_color,
+            fg="white",
+            activebackground=self.accent_color,
+            activeforeground="white",
+            relief=tk.FLAT,
+            borderwidth=0,
+            padx=20,
+            pady=10,
+            cursor="hand2"
+        ).pack(side=tk.RIGHT, padx=(0, 10))
+
+
+def print_startup_time(root, phases):
+    """Print how long each startup phase took once the window is drawn, then close it
+
+    phases is a list of (name, perf_counter at its end), timed from LOAD_START.
+    """
+    root.update_idletasks()
+    phases.append(('window drawn', time.perf_counter()))
+    previous = LOAD_START
+    for name, end in phases:
+        print(f"{name:<16} {(end - previous) * 1000:8.1f} ms")
+        previous = end
+    print(f"{'total':<16} {(previous - LOAD_START) * 1000:8.1f} ms (since this module started loading)")
+    root.destroy()
+
+
+def main(argv=None):
+    phases = [('imports', time.perf_counter())]
+    parser = argparse.ArgumentParser(description="Generate audit email templates from export ZIPs or CSVs")
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help=f"Dump the first {audit_log.DEFAULT_DUMP_ROWS} rows of each loaded CSV to the terminal")
+    parser.add_argument('--dump-rows', type=int, metavar='N', help="Dump the first N rows of each loaded CSV instead")
+    parser.add_argument('--log-file', help="Where generated templates are logged (default: in the per-user cache directory)")
+    parser.add_argument('--no-log', action='store_true', help="Don't log generated templates")
+    parser.add_argument('--templates', metavar='FILE', help="Email wording to use (default: email_templates.txt)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Start with Profile > Profile Loading on: every load writes a per-stage timing report")
+    parser.add_argument('--profile-cprofile', action='store_true',
+                        help="With --profile, add the slowest functions (cProfile; slows loading down)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="With --profile, add allocations and peak memory per stage (tracemalloc; slower)")
+    parser.add_argument('--profile-report', metavar='PATH',
+                        help=f"Where the profile report is written (default: {audit_profile.REPORT_FILE_NAME} "
+                             f"in the per-user cache directory)")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="Print how long the window took to appear, phase by phase, then exit")
+    args = parser.parse_args(argv)
+    audit_core.set_template_file(args.templates)
+
+    dump_rows = args.dump_rows if args.dump_rows is not None else audit_log.DEFAULT_DUMP_ROWS if args.verbose else 0
+    listener = audit_log.configure(args.log_file, templates=not args.no_log)
+    try:
+        root = tk.Tk()
+        phases.append(('Tk', time.perf_counter()))
+        try:
+            audit_core.load_templates()
+        except audit_core.TemplateError as e:
+            from tkinter import messagebox
+            root.withdraw()
+            messagebox.showerror("Audit Template Generator", str(e))
             return
-
-        # Calculate column widths
-        col_widths = []
-        for col_idx in range(len(rows[0])):
-            max_width = max(len(str(row[col_idx])) if col_idx < len(row) else 0
-                          for row in rows)
-            col_widths.append(min(max_width, 40))  # Cap at 40 chars
-
-        # Print header
-        header = rows[0]
-        header_line = " | ".join(str(header[i])[:col_widths[i]].ljust(col_widths[i])
-                                 for i in range(len(header)))
-        print(header_line)
-        print("-" * len(header_line))
-
-        # Print data rows
-        for row in rows[1:]:
-            row_line = " | ".join(
-                str(row[i])[:col_widths[i]].ljust(col_widths[i])
-                if i < len(row) else " " * col_widths[i]
-                for i in range(len(header))
-            )
-            print(row_line)
-
-        print("\n" + f"Total rows: {len(rows)-1}")
-        print("="*80 + "\n")
-
-
-def main():
-    root = tk.Tk()
-    app = ZipCSVReaderApp(root)
-    root.mainloop()
+        phases.append(('email templates', time.perf_counter()))
+        profile_options = (args.profile_cprofile, args.profile_memory) if args.profile else None
+        app = ZipCSVReaderApp(root, dump_rows, profile_options, args.profile_report)
+        phases.append(('widgets', time.perf_counter()))
+        if args.startup_time:
+            root.after_idle(print_startup_time, root, phases)
+        root.mainloop()
+    finally:
+        if listener is not None:
+            listener.stop()
 
 
 if __name__ == "__main__":
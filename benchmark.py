@@ -0,0 +1,309 @@
+"""Benchmark the template pipeline on synthetic audit exports
+
+Usage:
+    python benchmark.py --rooftops 500 --lines-per-rooftop 40 --csms 25
+
+Builds a ZIP holding lines_with_low_inbound_call_volume.csv,
+rooftop_information.csv and desk_phones.csv from a fixed random seed, so the
+same arguments always produce the same export. Each stage of the pipeline is
+then timed on its own (unzip, decode, parse, group, render, csm) along with
+the streamed end-to-end run used by batch mode. Stage timings are the best of
+--repeat runs; peak memory comes from a separate tracemalloc pass, since
+tracing slows everything down.
+
+The group, render and csm stages are the work done by generate_templates()
+and generate_csm_templates() in the desktop app. Nothing here imports tkinter.
+
+With --startup it instead times cold starts: fresh interpreters importing
+each module, and (when a display is available) the desktop window's
+--startup-time phases.
+"""
+import argparse
+import csv
+import gc
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+import audit_core
+
+
+LINES_MEMBER = 'export/lines_with_low_inbound_call_volume.csv'
+ROOFTOP_MEMBER = 'export/rooftop_information.csv'
+DESK_PHONES_MEMBER = 'export/desk_phones.csv'
+
+FIRST_NAMES = ['jane', 'john', 'maria', 'DAVID', 'li', 'José', 'fatima', 'ryan', "o'neil", 'ana-sofia']
+LAST_NAMES = ['doe', 'SMITH', 'garcía', 'nguyen', 'van der berg', 'müller', 'patel', 'brown']
+DEPARTMENTS = ['sales', 'service', 'parts', 'finance', 'BDC', 'front desk', 'body shop']
+
+
+def synthetic_csvs(rooftops, lines_per_rooftop, csms, seed=0):
+    """Build the three export CSVs as text
+
+    Some lines have no display name (exercising the owner type fallback),
+    roughly one rooftop in ten appears only in rooftop_information.csv (so the
+    CSM templates have skipped rooftops), and about a quarter of display names
+    have a desk phone. Returns (lines_text, rooftop_text, desk_phones_text).
+    """
+    rng = random.Random(seed)
+    display_names = []
+
+    lines = io.StringIO()
+    writer = csv.writer(lines)
+    writer.writerow(['Rooftop Name', 'Inbox Name', 'Display Name', 'Phone Number', 'Owner Type', 'Name', 'Call Count'])
+    for r in range(rooftops):
+        rooftop_name = f"Rooftop {r} Motors"
+        inbox_name = f"Rooftop {r} Sales"
+        for i in range(lines_per_rooftop):
+            owner_type = rng.choice(['USER', 'USER', 'DEPARTMENT', ''])
+            if owner_type == 'DEPARTMENT':
+                name = rng.choice(DEPARTMENTS)
+            else:
+                name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            display_name = '' if rng.random() < 0.2 else name
+            if display_name:
+                display_names.append(display_name)
+            phone_number = f"+1 ({rng.randint(200, 999)}) {rng.randint(200, 999)}-{(r * lines_per_rooftop + i) % 10000:04d}"
+            writer.writerow([rooftop_name, inbox_name, display_name, phone_number, owner_type, name, rng.randint(0, 3)])
+
+    rooftop = io.StringIO()
+    writer = csv.writer(rooftop)
+    writer.writerow(['Rooftop ID', 'Rooftop Name', 'CSM Owner'])
+    for r in range(rooftops + max(1, rooftops // 10)):
+        writer.writerow([r, f"Rooftop {r} Motors", f"Csm{r % csms} Person"])
+
+    desk_phones = io.StringIO()
+    writer = csv.writer(desk_phones)
+    writer.writerow(['Display Name', 'Phone Numbers'])
+    for display_name in sorted(set(display_names)):
+        if rng.random() < 0.25:
+            writer.writerow([display_name, f"555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}"])
+
+    return lines.getvalue(), rooftop.getvalue(), desk_phones.getvalue()
+
+
+def write_synthetic_zip(zip_path, rooftops, lines_per_rooftop, csms, seed=0, encoding='utf-8'):
+    """Write a synthetic export ZIP, returning the number of lines rows"""
+    lines_text, rooftop_text, desk_phones_text = synthetic_csvs(rooftops, lines_per_rooftop, csms, seed)
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr(LINES_MEMBER, lines_text.encode(encoding))
+        zip_ref.writestr(ROOFTOP_MEMBER, rooftop_text.encode(encoding))
+        zip_ref.writestr(DESK_PHONES_MEMBER, desk_phones_text.encode(encoding))
+    return rooftops * lines_per_rooftop
+
+
+class Stages:
+    """The pipeline split into separately timed steps
+
+    Each step reads what the previous one left on self, so any step can be
+    rerun on its own.
+    """
+
+    def __init__(self, zip_path):
+        self.zip_path = zip_path
+
+    def unzip(self):
+        with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
+            self.raw = {os.path.basename(name).lower(): zip_ref.read(name)
+                        for name in audit_core.list_zip_csv_members(zip_ref)}
+
+    def decode(self):
+        self.text = {}
+        for filename, data in self.raw.items():
+            encoding = audit_core.sniff_encoding(data[:audit_core.SNIFF_BYTES])
+            self.text[filename] = data.decode(encoding)
+
+    def parse(self):
+        self.csv_data = {filename: list(csv.reader(io.StringIO(text, newline='')))
+                         for filename, text in self.text.items()}
+
+    def group(self):
+        clear_normaliser_caches()
+        self.lines_file, self.rooftop_file, desk_phones_file = audit_core.classify_csv_files(self.csv_data)
+        desk_phone_lookup = audit_core.build_desk_phone_lookup(desk_phones_file)
+        self.rooftops = audit_core.group_lines_by_rooftop(self.lines_file, desk_phone_lookup)
+
+    def render(self):
+        self.renderer = audit_core.TemplateRenderer(self.rooftops)
+        self.renderer.all_dealership_text()
+
+    def csm(self):
+        # A renderer of its own each run, as TemplateRenderer caches what it renders
+        self.csm_renderer = audit_core.TemplateRenderer(
+            self.rooftops, audit_core.build_csm_rooftops(self.rooftop_file, self.rooftops))
+        self.csm_renderer.all_csm_text()
+
+    def pipeline(self):
+        clear_normaliser_caches()
+        audit_core.generate_from_zip(self.zip_path)
+
+
+def clear_normaliser_caches():
+    """Start a stage with cold caches, as a fresh process would"""
+    audit_core.format_phone_number.cache_clear()
+    audit_core.capitalize_name.cache_clear()
+
+
+STAGES = ['unzip', 'decode', 'parse', 'group', 'render', 'csm', 'pipeline']
+
+
+def time_stage(step, repeat):
+    """Best wall time of repeat runs of step, with GC collected in between"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        step()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(step):
+    """Peak bytes allocated by Python while step runs"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        step()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(zip_path, repeat=3, measure_memory=True):
+    """Time (and optionally trace) every stage on one export
+
+    Returns [(stage, seconds, peak bytes or None)] in pipeline order.
+    """
+    stages = Stages(zip_path)
+    results = []
+    for name in STAGES:
+        step = getattr(stages, name)
+        seconds = time_stage(step, repeat)
+        peak = peak_memory(step) if measure_memory else None
+        results.append((name, seconds, peak))
+    return results
+
+
+# Commands timed by --startup, each in a fresh interpreter
+STARTUP_COMMANDS = [
+    ('python', 'pass'),
+    ('import audit_core', 'import audit_core'),
+    ('import audit_batch', 'import audit_batch'),
+    ('import audit_template', 'import audit_template'),
+]
+
+
+def startup_times(repeat):
+    """Best wall time of repeat cold starts of each STARTUP_COMMANDS entry
+
+    Returns [(name, seconds)]; the bare interpreter comes first, so the
+    cost of each import is its time minus that one.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for name, code in STARTUP_COMMANDS:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=here, check=True)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results.append((name, best))
+    return results
+
+
+def print_startup_report(results):
+    """Print cold-start times, then the desktop window's own phase timings if it can open"""
+    baseline = results[0][1]
+    print(f"{'Cold start':<24} {'Time (ms)':>10} {'Over python':>12}")
+    print("-" * 48)
+    for name, seconds in results:
+        print(f"{name:<24} {seconds * 1000:10.1f} {(seconds - baseline) * 1000:12.1f}")
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    window = subprocess.run([sys.executable, os.path.join(here, 'audit_template.py'), '--startup-time', '--no-log'],
+                            cwd=here, capture_output=True, text=True)
+    print()
+    if window.returncode == 0:
+        print("Desktop window (audit_template.py --startup-time):")
+        print(window.stdout.rstrip())
+    else:
+        print("Desktop window not timed (no display?)")
+
+
+def print_report(results, row_count, zip_size, raw_size):
+    """Print a stage table with throughput in rows/s and MB/s of CSV text"""
+    print(f"{'Stage':<10} {'Time (s)':>10} {'Rows/s':>12} {'MB/s':>9} {'Peak MB':>9}")
+    print("-" * 54)
+    for name, seconds, peak in results:
+        size = zip_size if name == 'unzip' else raw_size
+        rows_per_sec = row_count / seconds if seconds else float('inf')
+        mb_per_sec = size / seconds / 1e6 if seconds else float('inf')
+        peak_text = f"{peak / 1e6:9.1f}" if peak is not None else f"{'-':>9}"
+        print(f"{name:<10} {seconds:10.4f} {rows_per_sec:12,.0f} {mb_per_sec:9.1f} {peak_text}")
+
+    # Counters from the last pipeline run
+    print()
+    for name, info in audit_core.normaliser_cache_info().items():
+        calls = info.hits + info.misses
+        hit_rate = info.hits / calls if calls else 0
+        print(f"{name}: {info.hits:,} hits, {info.misses:,} misses ({hit_rate:.0%}), {info.currsize:,} cached")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark template generation on a synthetic audit export")
+    parser.add_argument('--rooftops', type=int, default=200, help="Rooftops in the lines file (default: 200)")
+    parser.add_argument('--lines-per-rooftop', type=int, default=25, help="Lines per rooftop (default: 25)")
+    parser.add_argument('--csms', type=int, default=10, help="Distinct CSM owners (default: 10)")
+    parser.add_argument('--encoding', default='utf-8', help="Encoding of the CSV members (default: utf-8)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage; the best is reported (default: 3)")
+    parser.add_argument('--cache-size', type=int, default=audit_core.NORMALISER_CACHE_SIZE,
+                        help=f"Normaliser LRU size, 0 to disable (default: {audit_core.NORMALISER_CACHE_SIZE})")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass")
+    parser.add_argument('--keep', metavar='ZIP', help="Write the synthetic export here and keep it")
+    parser.add_argument('--startup', action='store_true',
+                        help="Time cold starts (module imports and the desktop window) instead")
+    args = parser.parse_args(argv)
+    audit_core.set_normaliser_cache_size(args.cache_size)
+
+    if args.startup:
+        print(f"Best of {args.repeat} run(s), Python {sys.version.split()[0]}\n")
+        print_startup_report(startup_times(args.repeat))
+        return 0
+
+    if args.keep:
+        zip_path = args.keep
+    else:
+        fd, zip_path = tempfile.mkstemp(suffix='.zip')
+        os.close(fd)
+
+    try:
+        row_count = write_synthetic_zip(zip_path, args.rooftops, args.lines_per_rooftop,
+                                        args.csms, args.seed, args.encoding)
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            raw_size = sum(info.file_size for info in zip_ref.infolist())
+        zip_size = os.path.getsize(zip_path)
+
+        print(f"Synthetic export: {args.rooftops} rooftops x {args.lines_per_rooftop} lines "
+              f"= {row_count:,} rows, {args.csms} CSMs")
+        print(f"CSV text {raw_size / 1e6:.1f} MB, ZIP {zip_size / 1e6:.1f} MB, "
+              f"best of {args.repeat} run(s), Python {sys.version.split()[0]}\n")
+
+        results = run_benchmark(zip_path, args.repeat, not args.no_memory)
+        print_report(results, row_count, zip_size, raw_size)
+    finally:
+        if not args.keep:
+            os.remove(zip_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""CsmJoin: which rooftops a CSM gets, which are skipped, and what is reported"""
+from audit_core import UNKNOWN_CSM, CsmJoin, build_rooftop_to_csm
+
+
+def grouped(*names):
+    return {name: {'inbox_name': f"{name} inbox", 'lines': []} for name in names}
+
+
+def directory(*rows):
+    return build_rooftop_to_csm([['Rooftop ID', 'Rooftop Name', 'CSM Owner']] + [['0', *row] for row in rows])
+
+
+def included(join, csm_owner):
+    return [rooftop['rooftop_name'] for rooftop in join.csm_rooftops[csm_owner]['included']]
+
+
+def test_exact_and_normalised_names_join():
+    join = CsmJoin(grouped('Acme Motors', 'BETA  cars', 'Ｇａｍｍａ Auto'),
+                   *directory(['Acme Motors', 'Ann Lee'], ['Beta Cars', 'Ann Lee'], ['Gamma Auto', 'Bo Chan']))
+    assert join.matched == {'Acme Motors': 'Ann Lee', 'BETA  cars': 'Ann Lee', 'Ｇａｍｍａ Auto': 'Bo Chan'}
+    assert included(join, 'Ann Lee') == ['Acme Motors', 'BETA  cars']
+    assert join.csm_rooftops['Ann Lee']['included'][0]['inbox_name'] == 'Acme Motors inbox'
+    assert join.counts['matched'] == 3
+    assert join.counts['normalised_matches'] == 2
+    assert not join.unmatched_left and not join.diagnostics
+
+
+def test_exact_name_wins_over_normalised_one():
+    join = CsmJoin(grouped('ACME MOTORS'), *directory(['ACME MOTORS', 'Ann Lee'], ['acme motors', 'Bo Chan']))
+    assert join.matched == {'ACME MOTORS': 'Ann Lee'}
+    assert join.counts['normalised_matches'] == 0
+
+
+def test_unmatched_rooftops_go_to_unknown_csm_with_a_suggestion():
+    join = CsmJoin(grouped('Acme Motor', 'Zed'), *directory(['Acme Motors', 'Ann Lee']))
+    assert join.unmatched_left == ['Acme Motor', 'Zed']
+    assert included(join, UNKNOWN_CSM) == ['Acme Motor', 'Zed']
+    assert join.counts['unmatched_rooftops'] == 2
+    assert "closest: 'Acme Motors', Ann Lee" in join.diagnostics[0]
+    assert 'closest' not in join.diagnostics[1]
+
+
+def test_directory_rooftops_without_lines_are_skipped():
+    join = CsmJoin(grouped('Acme Motors'),
+                   *directory(['Acme Motors', 'Ann Lee'], ['Beta Cars', 'Ann Lee'], ['Gamma Auto', 'Bo Chan']))
+    assert join.csm_rooftops['Ann Lee'] == {
+        'included': [{'rooftop_name': 'Acme Motors', 'inbox_name': 'Acme Motors inbox'}],
+        'skipped': ['Beta Cars'],
+    }
+    assert join.csm_rooftops['Bo Chan'] == {'included': [], 'skipped': ['Gamma Auto']}
+    assert join.unmatched_right == {'Ann Lee': ['Beta Cars'], 'Bo Chan': ['Gamma Auto']}
+    assert join.counts['unmatched_directory_rooftops'] == 2
+
+
+def test_directory_rows_without_a_name_or_csm_are_ignored():
+    rooftop_to_csm, all_rooftops_by_csm = directory(['Acme Motors', 'Ann Lee'], [' ', 'Bo Chan'], ['Beta Cars', ''])
+    assert rooftop_to_csm == {'Acme Motors': 'Ann Lee'}
+    assert all_rooftops_by_csm == {'Ann Lee': ['Acme Motors']}
+    assert build_rooftop_to_csm([['Rooftop ID', 'Owner']]) is None
+
+
+def test_report_keeps_collisions_apart_from_unknown_csm(capsys):
+    join = CsmJoin(grouped('Acme Motors'), *directory(['Acme Motors', 'Ann Lee'], ['ACME  motors', 'Bo Chan']))
+    assert len(join.collisions) == 1 and not join.diagnostics
+    join.report()
+    output = capsys.readouterr().out
+    assert UNKNOWN_CSM not in output
+    assert "'Acme Motors' and 'ACME  motors'" in output
+
+    join = CsmJoin(grouped('Zed'), *directory(['Acme Motors', 'Ann Lee']))
+    join.report()
+    assert f"1 rooftop(s) assigned to {UNKNOWN_CSM}" in capsys.readouterr().out
+
+    join = CsmJoin(grouped('Acme Motors'), *directory(['Acme Motors', 'Ann Lee']))
+    join.report()
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,109 @@
+"""NameIndex matching checked against a brute-force scan of every name"""
+import random
+
+import pytest
+
+import audit_core
+from audit_core import NO_MATCH, NameIndex, canonical_name, name_trigrams
+
+SYLLABLES = ['ma', 'ri', 'o', 'a', 'gar', 'ci', 'jo', 'hn', 'smi', 'th', 'lee', 'an', 'é', 'ng']
+
+
+def random_name(rng):
+    words = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(1, 3))]
+    name = rng.choice([' ', '  ', ', ', '-']).join(words)
+    return name.title() if rng.random() < 0.5 else name
+
+
+def perturb(rng, name):
+    """name reordered, re-punctuated or with one letter changed, to reach canonical and near matches"""
+    choice = rng.randrange(3)
+    if choice == 0:
+        return ', '.join(reversed(name.split()))
+    position = rng.randrange(len(name))
+    if choice == 1:
+        return name[:position] + rng.choice('aeiouxy') + name[position + 1:]
+    return name[:position] + rng.choice('aeiouxy') + name[position:]
+
+
+def brute_force_match(names, name, min_score):
+    """What NameIndex.match should return, scanning every added name"""
+    exact = {}
+    canonical = {}
+    for added, value in names:
+        exact[added.strip().lower()] = value
+        if canonical_name(added):
+            canonical[canonical_name(added)] = value
+
+    if name.strip().lower() in exact:
+        return exact[name.strip().lower()], 1.0, False
+    key = canonical_name(name)
+    if not key or not canonical:
+        return NO_MATCH
+    if key in canonical:
+        return canonical[key], audit_core.CANONICAL_MATCH_SCORE, False
+
+    trigrams = name_trigrams(key)
+    scores = {}
+    for other_key, value in canonical.items():
+        other = name_trigrams(other_key)
+        score = 2 * len(trigrams & other) / (len(trigrams) + len(other))
+        scores.setdefault(score, set()).add(value)
+    best_score = max(scores)
+    if best_score < min_score or len(scores[best_score]) > 1:
+        return NO_MATCH
+    return next(iter(scores[best_score])), round(best_score, 3), True
+
+
+@pytest.mark.parametrize('min_score', [audit_core.DESK_PHONE_MIN_SCORE, audit_core.SUGGESTION_MIN_SCORE])
+def test_match_agrees_with_brute_force(min_score):
+    rng = random.Random(min_score)
+    for _ in range(40):
+        names = [(random_name(rng), str(rng.randint(0, 5))) for _ in range(rng.randint(1, 30))]
+        index = NameIndex(min_score=min_score)
+        for name, value in names:
+            index.add(name, value)
+        queries = [random_name(rng) for _ in range(30)] + [name for name, _ in names]
+        queries += [perturb(rng, name) for name, _ in names]
+        for query in queries:
+            assert index.match(query) == brute_force_match(names, query, min_score), query
+
+
+def test_match_kinds():
+    index = NameIndex()
+    index.add('John Smith', '111')
+    index.add('Maria Garcia', '222')
+    assert index.match('JOHN SMITH ') == ('111', 1.0, False)
+    assert index.match('Smith, John') == ('111', audit_core.CANONICAL_MATCH_SCORE, False)
+    value, score, near = index.match('Maria Garcias')
+    assert (value, near) == ('222', True) and audit_core.DESK_PHONE_MIN_SCORE <= score < 1
+    assert index.match('Someone Else') == NO_MATCH
+    assert NameIndex().match('John Smith') == NO_MATCH
+
+
+def test_equally_close_names_with_different_values_do_not_match():
+    index = NameIndex(min_score=0.5)
+    index.add('abcx', '1')
+    index.add('abcy', '2')
+    assert index.match('abc') == NO_MATCH
+    index.add('abcy', '1')
+    assert index.match('abc') == ('1', 0.667, True)
+
+
+def test_add_resets_memoised_matches():
+    index = NameIndex()
+    index.add('Maria Garcia', '222')
+    assert index.match('Mario Garcia')[2]
+    index.add('Mario Garcia', '333')
+    assert index.match('Mario Garcia') == ('333', 1.0, False)
+
+
+def test_near_match_is_only_a_suggested_desk_phone():
+    index = NameIndex()
+    index.add('Maria Garcia', '222')
+    index.add('John Smith', '111')
+    desk_phone, desk_phone_score, suggested, suggested_score = audit_core.desk_phone_fields(index, 'Mario Garcia')
+    assert (desk_phone, desk_phone_score, suggested) == ('', 0.0, '222')
+    assert suggested_score >= audit_core.DESK_PHONE_MIN_SCORE
+    assert audit_core.desk_phone_fields(index, 'john smith') == ('111', 1.0, '', 0.0)
+    assert audit_core.desk_phone_fields(index, 'Nobody') == ('', 0.0, '', 0.0)
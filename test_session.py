@@ -0,0 +1,99 @@
+"""Session.update: what each new file recomputes, and what it reports as changed"""
+import threading
+
+import pytest
+
+import audit_core
+from audit_core import Session
+
+LINES = 'lines_with_low_inbound_call_volume.csv'
+ROOFTOP = 'rooftop_information.csv'
+DESK_PHONES = 'desk_phones.csv'
+
+LINES_ROWS = [
+    ['Rooftop Name', 'Inbox Name', 'Display Name', 'Phone Number', 'Owner Type', 'Name'],
+    ['Acme Motors', 'Acme Sales', 'john smith', '15550000001', 'USER', 'jsmith'],
+    ['Acme Motors', 'Acme Sales', '', '15550000002', 'DEPARTMENT', 'service'],
+    ['Beta Cars', 'Beta Inbox', 'Maria Garcia', '5550000003', 'USER', 'mgarcia'],
+]
+ROOFTOP_ROWS = [['Rooftop Name', 'CSM Owner'], ['Acme Motors', 'Ann Lee'], ['Beta Cars', 'Bo Chan']]
+DESK_PHONE_ROWS = [['Display Name', 'Phone Number'], ['John Smith', '555-111-1111'], ['Maria Garcia', '555-222-2222']]
+
+
+def desk_phones(session):
+    return {line.raw_display_name: line.desk_phone
+            for data in session.renderer.rooftops.values() for line in data['lines'] if line.raw_display_name}
+
+
+@pytest.fixture
+def loaded():
+    session, changed = Session().update({LINES: LINES_ROWS, ROOFTOP: ROOFTOP_ROWS})
+    assert changed == {'dealership', 'csm'}
+    return session
+
+
+def test_nothing_renders_until_lines_and_rooftop_information_are_loaded():
+    session, changed = Session().update({DESK_PHONES: DESK_PHONE_ROWS})
+    assert session.renderer is None and changed == set()
+    session, changed = session.update({LINES: LINES_ROWS})
+    assert session.renderer is None and changed == set()
+    session, changed = session.update({ROOFTOP: ROOFTOP_ROWS})
+    assert changed == {'dealership', 'csm'}
+    assert desk_phones(session) == {'john smith': '555-111-1111', 'Maria Garcia': '555-222-2222'}
+
+
+def test_desk_phones_only_change_dealership_templates(loaded):
+    session, changed = loaded.update({DESK_PHONES: DESK_PHONE_ROWS})
+    assert changed == {'dealership'}
+    assert session.renderer.csm_rooftops is loaded.renderer.csm_rooftops
+    assert desk_phones(session) == {'john smith': '555-111-1111', 'Maria Garcia': '555-222-2222'}
+    # The old session's lines keep their desk phones
+    assert set(desk_phones(loaded).values()) == {''}
+
+
+def test_rooftop_information_only_changes_csm_templates(loaded):
+    session, changed = loaded.update({ROOFTOP: [['Rooftop Name', 'CSM Owner'], ['Acme Motors', 'Cy Diaz']]})
+    assert changed == {'csm'}
+    assert session.rooftops is loaded.rooftops
+    assert session.renderer.csm_owners() == ['Cy Diaz', audit_core.UNKNOWN_CSM]
+    assert loaded.renderer.csm_owners() == ['Ann Lee', 'Bo Chan']
+
+
+def test_new_lines_change_everything(loaded):
+    session, changed = loaded.update({LINES: LINES_ROWS[:2]})
+    assert changed == {'dealership', 'csm'}
+    assert list(session.renderer.rooftops) == ['Acme Motors']
+
+
+def test_unrelated_files_change_nothing(loaded):
+    session, changed = loaded.update({'notes.csv': [['Anything'], ['at all']]})
+    assert changed == set()
+    assert session.renderer.rooftops is loaded.renderer.rooftops
+
+
+def test_lines_without_required_columns_drop_the_templates(loaded):
+    session, changed = loaded.update({LINES: [['Rooftop Name', 'Inbox Name'], ['Acme Motors', 'Acme Sales']]})
+    assert session.renderer is None
+    assert changed == {'dealership', 'csm'}
+
+
+def test_rooftop_information_without_required_columns_drops_the_csm_templates(loaded):
+    session, changed = loaded.update({ROOFTOP: [['Rooftop Name', 'Owner'], ['Acme Motors', 'Ann Lee']]})
+    assert changed == {'csm'}
+    assert session.renderer.csm_rooftops is None
+    assert session.renderer.rooftops is loaded.renderer.rooftops
+
+
+def test_desk_phones_without_required_columns_clear_the_desk_phones(loaded):
+    with_phones, _ = loaded.update({DESK_PHONES: DESK_PHONE_ROWS})
+    session, changed = with_phones.update({DESK_PHONES: [['Display Name', 'Extension'], ['John Smith', '12']]})
+    assert changed == {'dealership'}
+    assert set(desk_phones(session).values()) == {''}
+
+
+def test_cancelled_update_leaves_the_session_alone(loaded):
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(audit_core.Cancelled):
+        loaded.update({LINES: LINES_ROWS[:2]}, cancel_event=cancel_event)
+    assert list(loaded.renderer.rooftops) == ['Acme Motors', 'Beta Cars']
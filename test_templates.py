@@ -0,0 +1,76 @@
+"""Compiled templates render exactly what string.Template would"""
+import random
+import string
+
+import pytest
+
+import audit_core
+from audit_core import TemplateError, compile_template, parse_template_sections
+
+FIELDS = {'rooftop': 'rooftop', 'inbox': 'inbox'}
+
+# Pieces that are special to f-strings, repr() or string.Template
+PIECES = ['{', '}', '{{', '}}', '{rooftop}', "'", '"', "'''", '"""', '\\', '\\\\', '\\n', '\\N{BULLET}',
+          '\\x41', '\n', '\r\n', '\t', 'é', '•', '\x00', '$$', '$rooftop', '${inbox}', '$inbox_', 'text', ' ']
+
+
+def render(text, rooftop, inbox):
+    return compile_template(text, 'rooftop, inbox', FIELDS, '<test>')(rooftop, inbox)
+
+
+@pytest.mark.parametrize('text', [
+    '{rooftop} {{inbox}} }{',
+    'It\'s "quoted" and \'\'\'triple\'\'\' """quoted"""',
+    'C:\\path\\new \\N{BULLET} \\u2022 \\',
+    'Costs $$5 for ${rooftop}, $inbox.',
+    '',
+])
+def test_special_text_renders_like_string_template(text):
+    values = {'rooftop': "Acme {Motors} 'x' \\N{BULLET}", 'inbox': '"$inbox"'}
+    assert render(text, **values) == string.Template(text).substitute(values)
+
+
+def test_random_text_renders_like_string_template():
+    rng = random.Random(23)
+    for _ in range(2000):
+        text = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 12)))
+        values = {'rooftop': ''.join(rng.choice(PIECES) for _ in range(3)), 'inbox': rng.choice(PIECES)}
+        try:
+            expected = string.Template(text).substitute(values)
+        except (KeyError, ValueError):
+            # Pieces can run together into an unknown placeholder such as $rooftoptext
+            with pytest.raises(TemplateError):
+                render(text, **values)
+        else:
+            assert render(text, **values) == expected, text
+
+
+@pytest.mark.parametrize('text', ['$dealer', '${rooftop_name}', 'costs $5', 'ends with $', '${rooftop'])
+def test_bad_placeholders_raise_template_error(text):
+    with pytest.raises(TemplateError):
+        render(text, 'Acme', 'inbox')
+
+
+def test_placeholders_cannot_inject_code():
+    text = "${rooftop}{__import__('os').getcwd()}"
+    assert render(text, 'Acme', 'inbox') == "Acme{__import__('os').getcwd()}"
+
+
+def test_parse_template_sections():
+    text = "# comment\n[dealership.subject]\nHi $rooftop\n\n[csm.subject]\n# also a comment\nLine 1\n\nLine 2\n\n"
+    assert parse_template_sections(text, 'test') == {'dealership.subject': 'Hi $rooftop',
+                                                     'csm.subject': 'Line 1\n\nLine 2'}
+    with pytest.raises(TemplateError, match='unknown section'):
+        parse_template_sections('[dealer.subject]\n', 'test')
+    with pytest.raises(TemplateError, match='before the first'):
+        parse_template_sections('stray\n[csm.subject]\n', 'test')
+
+
+def test_missing_sections_raise_template_error():
+    with pytest.raises(TemplateError, match=r'\[csm.body\]'):
+        audit_core.EmailTemplates({section: '' for section in audit_core.TEMPLATE_FIELDS if section != 'csm.body'})
+
+
+def test_default_template_file_compiles():
+    templates = audit_core.load_templates(audit_core.TEMPLATE_FILE)
+    assert 'Acme' in templates.dealership_subject('Acme', 'inbox')